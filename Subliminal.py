@@ -288,6 +288,18 @@
 # NOTE: This option is only applied to Scheduling.
 #MaxAge=24
 
+# Full Scan Interval
+#
+# The scan directories are walked incrementally: the state of every
+# directory is kept in a journal (in the cache directory) and the
+# directories that did not change since the last scan are not listed
+# again. Every so often the journal is ignored and a full scan is done
+# instead to reconcile it with what is actually on disk. This value is
+# identified in hours; set it to 0 (zero) to always do a full scan.
+#
+# NOTE: This option is only applied to Scheduling.
+#FullScanInterval=24
+
 # Addic7ed Username
 #
 # If you wish to utilize the addic7ed provider, you are additionally required
@@ -337,6 +349,15 @@
 # a Throttle Threshold is reached.
 #Throttle=3
 
+# Workers.
+#
+# The number of workers analyzing the video files (guessing their content
+# and, in advanced search mode, hashing and reading their headers) ahead of
+# the subtitle searches. This speeds up the scan of a large library on a
+# multi-core system. Set this value to 1 (one) to analyze the files one at
+# a time.
+#Workers=1
+
 # Enable debug logging (yes, no).
 #
 # If subtitles are not downloaded as expected, activate debug logging
@@ -372,12 +393,38 @@ from os.path import splitext
 from os.path import isfile
 from os.path import exists
 from os.path import isdir
+from os.path import islink
 from os import unlink
 from os import chdir
 from os import makedirs
+from os import listdir
+from os import lstat
+from os import rename
+from os import read as os_read
+from os import close as os_close
+from os import fdopen
+from os import strerror as os_strerror
+from stat import S_ISDIR
+from stat import S_ISREG
+from stat import S_ISLNK
+from stat import ST_SIZE
+from stat import ST_MTIME
+from stat import ST_ATIME
+from stat import ST_CTIME
 from time import sleep
+from time import time
+from tempfile import mkstemp
+import cPickle as pickle
+from select import select
+from struct import unpack
+from struct import calcsize
+import ctypes
+import ctypes.util
 
 import logging
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 from ConfigParser import ConfigParser
 from ConfigParser import Error as ConfigException
 from ConfigParser import NoOptionError as ConfigNoOption
@@ -398,11 +445,16 @@ from datetime import timedelta
 from datetime import datetime
 from subliminal import Video
 from subliminal import Episode
+from subliminal import VideoHashes
 from subliminal import MutexLock
 from subliminal import cache_region
 from subliminal import scan_video
+from subliminal import get_provider_hashes
+from subliminal import get_subtitle_directory
+from subliminal import clear_subtitle_directories
 from subliminal import download_best_subtitles
 from subliminal.subtitle import detect
+from subliminal.providers import sessions as provider_sessions
 import babelfish
 
 # pynzbget Script Wrappers
@@ -527,6 +579,56 @@ DEFAULT_FORCE_ENCODING = 'None'
 DEFAULT_SYSTEM_ENCODING = 'UTF-8'
 DEFAULT_THROTTLE_THRESHOLD = 5
 DEFAULT_THROTTLE_WAITTIME = 3
+DEFAULT_WORKERS = 1
+DEFAULT_FULL_SCAN_INTERVAL = 24
+
+# The number of videos whose subtitles are searched for together
+SEARCH_BATCH_SIZE = 20
+
+# The file (in the cache directory) the scan directories journal is kept in
+SCAN_JOURNAL_FILE = 'subliminal.scan.journal'
+
+# The journal format version; a journal of another version is discarded
+SCAN_JOURNAL_VERSION = 1
+
+# The file (in the cache directory) the OpenSubtitles session token is kept
+# in between runs so that each run does not have to log in and out again
+OPENSUBTITLES_TOKEN_FILE = 'subliminal.opensubtitles.token'
+
+# The number of seconds a file must have been left alone in watch mode
+# before its subtitles are fetched
+DEFAULT_WATCH_DELAY = 10
+
+# Linux inotify(7) flags used by the watch mode
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+# The events watched for on every directory; a file is only complete once
+# closed after writing (IN_CLOSE_WRITE) or moved in (IN_MOVED_TO), creating
+# one (IN_CREATE) is only of interest for directories
+INOTIFY_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+# struct inotify_event header (wd, mask, cookie, len)
+INOTIFY_EVENT_FORMAT = 'iIII'
+INOTIFY_EVENT_SIZE = calcsize(INOTIFY_EVENT_FORMAT)
+
+# The directories never scanned
+SCAN_SKIP_DIRECTORIES = (
+    # OS X Meta Directories
+    '.DS_Store',
+    '.AppleDouble',
+    '__MACOSX',
+)
 
 # A list of compiled regular expressions identifying files to not parse ever
 IGNORE_FILELIST_RE = (
@@ -665,6 +767,526 @@ def decode(str_data, encoding=None, lang=None):
     return None
 
 
+class LogCapture(logging.Filter):
+    """
+    A filter that holds back the log records of the threads (or forked
+    processes) that started capturing, so that they can be emitted later
+    on, in order, by the main thread.
+
+    The records held back are made picklable so that they can be returned
+    by worker processes.
+    """
+    def __init__(self):
+        logging.Filter.__init__(self)
+        self.local = threading.local()
+
+    def start(self):
+        """Start holding back the records of the current thread"""
+        self.local.records = []
+
+    def stop(self):
+        """Stop holding back records and return the ones held back"""
+        records = getattr(self.local, 'records', None) or []
+        self.local.records = None
+        return records
+
+    def filter(self, record):
+        records = getattr(self.local, 'records', None)
+        if records is None:
+            return True
+
+        # The same record goes through every handler
+        if not records or records[-1] is not record:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = \
+                    logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            records.append(record)
+        return False
+
+
+# The script, log capture and arguments of the running analysis, see
+# SubliminalScript.analyze_files()
+_analysis = None
+
+
+def _guess_file_worker(entry):
+    """
+    Worker wrapper of SubliminalScript.guess_file() returning its result
+    and the log records it held back
+    """
+    script, capture, guess_kwargs, probe_kwargs = _analysis
+    capture.start()
+    try:
+        result = script.guess_file(entry, **guess_kwargs)
+    finally:
+        records = capture.stop()
+    return result, records
+
+
+def _probe_file_worker(guessed):
+    """
+    Worker wrapper of SubliminalScript.probe_file() taking and returning
+    the log records held back along with the result
+    """
+    guessed, records = guessed
+    if guessed is None:
+        return None, records
+
+    script, capture, guess_kwargs, probe_kwargs = _analysis
+    capture.start()
+    try:
+        result = script.probe_file(guessed, **probe_kwargs)
+    finally:
+        records = records + capture.stop()
+    return result, records
+
+
+class ScanJournal(object):
+    """
+    Incremental walk of the scan directories.
+
+    The journal keeps the mtime of every directory walked along with its
+    sub-directories and the stats of the files it holds that matched the
+    suffix filter. A directory whose mtime did not change since it was
+    listed has had no entry added, removed or renamed; it is not listed
+    again and its files are taken from the journal. Its sub-directories
+    are still stat'ed (a change deep in a tree does not reach the mtime
+    of its parents) and so are its files (a file rewritten in place does
+    not change the mtime of its directory either); what is saved is the
+    listing of every directory and the stat of every entry the suffix
+    filter leaves out.
+
+    A full scan (listing every directory) is done when the journal is
+    older than the full scan interval, when the suffix filter changed or
+    when it can not be read.
+    """
+    def __init__(self, path, interval=DEFAULT_FULL_SCAN_INTERVAL,
+                 logger=None):
+        # The file the journal is loaded from and saved to
+        self.path = path
+
+        # The full scan interval (in hours)
+        self.interval = interval
+
+        self.logger = logger if logger else logging.getLogger(__name__)
+
+        # The directories, by path, as tuples of their mtime, the time
+        # they were listed, their sub-directory names and their files
+        self.directories = {}
+
+        # The suffix filter the files were matched against
+        self.suffix_filter = None
+
+        # When the last full scan was done
+        self.reconciled = 0
+
+        # The directories walked by the last scan() and the number of them
+        # that had to be listed
+        self.walked = {}
+        self.listed = 0
+
+        # Whether symbolic links to directories are walked
+        self.followlinks = False
+
+    def load(self):
+        """Load the journal, returns True if it was"""
+        try:
+            with open(self.path, 'rb') as f:
+                journal = pickle.load(f)
+
+        except (IOError, OSError):
+            # No journal yet
+            return False
+
+        except Exception as e:
+            self.logger.warning(
+                'Discarding unreadable scan journal %s' % self.path)
+            self.logger.debug('Scan journal exception %s' % str(e))
+            return False
+
+        if not isinstance(journal, dict) or \
+                journal.get('version') != SCAN_JOURNAL_VERSION:
+            self.logger.debug('Discarding outdated scan journal')
+            return False
+
+        self.directories = journal['directories']
+        self.suffix_filter = journal['suffix_filter']
+        self.reconciled = journal['reconciled']
+        return True
+
+    def save(self):
+        """Save the journal of the last scan(), returns True if it was"""
+        journal = {
+            'version': SCAN_JOURNAL_VERSION,
+            'directories': self.walked,
+            'suffix_filter': self.suffix_filter,
+            'reconciled': self.reconciled,
+        }
+
+        tmp_path = None
+        try:
+            # A temporary file of its own as several runs (a scheduled scan
+            # and the watch mode for instance) can share the journal
+            fd, tmp_path = mkstemp(
+                dir=dirname(self.path) or '.',
+                prefix='%s.' % basename(self.path),
+            )
+            with fdopen(fd, 'wb') as f:
+                pickle.dump(journal, f, pickle.HIGHEST_PROTOCOL)
+
+            if sys.platform.startswith('win') and exists(self.path):
+                # rename() does not replace files on Windows
+                unlink(self.path)
+            rename(tmp_path, self.path)
+
+        except (IOError, OSError) as e:
+            self.logger.warning(
+                'Could not save scan journal %s' % self.path)
+            self.logger.debug('Scan journal exception %s' % str(e))
+            if tmp_path is not None and exists(tmp_path):
+                try:
+                    unlink(tmp_path)
+
+                except OSError:
+                    pass
+            return False
+
+        return True
+
+    def scan(self, paths, suffix_filter, followlinks=False):
+        """
+        Walks the directory paths and returns the files matching the
+        suffix filter in the same form get_files() returns them with
+        fullstats set.
+        """
+        suffix_filter = tuple(sorted(set(
+            s.lower() for s in suffix_filter)))
+
+        now = time()
+        full = suffix_filter != self.suffix_filter or \
+            now - self.reconciled >= self.interval * 3600
+
+        if full:
+            self.logger.debug('Performing a full scan')
+            self.reconciled = now
+        self.suffix_filter = suffix_filter
+
+        self.followlinks = followlinks
+        self.walked = {}
+        self.listed = 0
+        files = {}
+        for path in paths:
+            self._walk(abspath(path), files, full)
+
+        self.logger.debug(
+            'Scanned %d directories, %d listed' % (
+                len(self.walked), self.listed))
+        return files
+
+    def _walk(self, path, files, full):
+        """Walks a directory, adding its files to the files dictionary"""
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            if path in self.walked:
+                # Already walked from another scan directory
+                continue
+
+            try:
+                mtime = stat(path).st_mtime
+
+            except OSError as e:
+                self.logger.warning('Could not access %s' % path)
+                self.logger.debug('Reason %s' % str(e))
+                continue
+
+            entry = None if full else self.directories.get(path)
+            if entry is None or entry[0] != mtime or mtime >= entry[1] - 1:
+                # The directory changed since it was listed (or it changed
+                # within the mtime granularity of its listing)
+                entry = self._list(path, mtime)
+                if entry is None:
+                    continue
+
+            else:
+                entry = self._restat(path, entry)
+
+            self.walked[path] = entry
+            for filename, stats in entry[3].items():
+                files[join(path, filename)] = {
+                    'basename': filename,
+                    'dirname': path,
+                    'extension': splitext(filename)[1].lower(),
+                    'filename': splitext(filename)[0],
+                    'filesize': stats[0],
+                    'modified': self._datetime(stats[1]),
+                    'accessed': self._datetime(stats[2]),
+                    'created': self._datetime(stats[3]),
+                }
+
+            pending.extend(join(path, d) for d in reversed(entry[2]))
+
+    def _list(self, path, mtime):
+        """Lists a directory, returns its journal entry"""
+        listed = time()
+        try:
+            dirents = listdir(path)
+
+        except OSError as e:
+            self.logger.error('Could not access %s' % path)
+            self.logger.error('Reason %s' % str(e))
+            return None
+
+        self.listed += 1
+        directories = []
+        filestats = {}
+        for dirent in dirents:
+            fullpath = join(path, dirent)
+            try:
+                stat_obj = lstat(fullpath)
+                if S_ISLNK(stat_obj.st_mode):
+                    stat_obj = stat(fullpath)
+                    if S_ISDIR(stat_obj.st_mode) and not self.followlinks:
+                        # honor followlinks
+                        continue
+
+            except OSError:
+                # Removed (or a broken link)
+                continue
+
+            if S_ISDIR(stat_obj.st_mode):
+                if dirent not in SCAN_SKIP_DIRECTORIES:
+                    directories.append(dirent)
+
+            elif S_ISREG(stat_obj.st_mode) and \
+                    dirent.lower().endswith(self.suffix_filter):
+                filestats[dirent] = self._stats(stat_obj)
+
+        return (mtime, listed, sorted(directories), filestats)
+
+    def _restat(self, path, entry):
+        """
+        Stats the files of an unchanged directory (they may have been
+        rewritten in place since), returns its updated journal entry
+        """
+        filestats = entry[3]
+        for filename in filestats.keys():
+            try:
+                filestats[filename] = self._stats(stat(join(path, filename)))
+
+            except OSError:
+                # File became inaccessible
+                del filestats[filename]
+
+        return entry
+
+    @staticmethod
+    def _stats(stat_obj):
+        """The file stats kept in the journal (as get_files() has them)"""
+        return (
+            stat_obj[ST_SIZE],
+            stat_obj[ST_MTIME],
+            stat_obj[ST_ATIME],
+            stat_obj[ST_CTIME],
+        )
+
+    @staticmethod
+    def _datetime(timestamp):
+        try:
+            return datetime.fromtimestamp(timestamp)
+
+        except ValueError:
+            return datetime(1980, 1, 1, 0, 0, 0, 0)
+
+
+class InotifyWatcher(object):
+    """
+    Watches directory trees for the files written or moved into them
+    using the Linux inotify API (through ctypes).
+
+    Raises OSError if inotify is not available.
+    """
+    def __init__(self, followlinks=False, logger=None):
+        self.logger = logger if logger else logging.getLogger(__name__)
+
+        # Whether symbolic links to directories are watched
+        self.followlinks = followlinks
+
+        # inotify works on bytes; the watched paths are encoded (and the
+        # names it reports decoded) with the filesystem encoding
+        self.encoding = sys.getfilesystemencoding() or 'utf-8'
+
+        # The watched directories by watch descriptor and the reverse
+        self.watches = {}
+        self.descriptors = {}
+
+        library = ctypes.util.find_library('c')
+        try:
+            self.libc = ctypes.CDLL(library, use_errno=True)
+            self.libc.inotify_init1
+            self.libc.inotify_add_watch
+
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, 'inotify is not supported')
+
+        self.libc.inotify_add_watch.argtypes = \
+            [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            _errno = ctypes.get_errno()
+            raise OSError(_errno, os_strerror(_errno))
+
+    def close(self):
+        """Stops watching"""
+        if self.fd >= 0:
+            os_close(self.fd)
+            self.fd = -1
+        self.watches = {}
+        self.descriptors = {}
+
+    def add_tree(self, path):
+        """
+        Watches a directory and all its sub-directories, returns the files
+        found in them (that may have arrived before they were watched).
+        """
+        files = []
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            if path in self.descriptors:
+                continue
+
+            _path = path
+            if isinstance(_path, unicode):
+                try:
+                    _path = _path.encode(self.encoding)
+
+                except UnicodeEncodeError:
+                    self.logger.warning(
+                        'Could not watch %s (unsupported filename encoding)'
+                        % path.encode('utf-8'))
+                    continue
+
+            wd = self.libc.inotify_add_watch(
+                self.fd, _path, INOTIFY_WATCH_MASK)
+            if wd < 0:
+                _errno = ctypes.get_errno()
+                if _errno == errno.ENOENT:
+                    # Removed (or moved) since
+                    continue
+
+                self.logger.warning('Could not watch %s' % path)
+                self.logger.debug('Reason %s' % os_strerror(_errno))
+                if _errno == errno.ENOSPC:
+                    self.logger.warning(
+                        'The inotify watch limit was reached; see '
+                        '/proc/sys/fs/inotify/max_user_watches')
+                continue
+
+            if wd in self.watches:
+                # The directory was moved; its watch is kept
+                self.descriptors.pop(self.watches[wd], None)
+
+            self.watches[wd] = path
+            self.descriptors[path] = wd
+
+            try:
+                dirents = listdir(path)
+
+            except OSError:
+                # Removed since
+                continue
+
+            for dirent in dirents:
+                if isinstance(path, unicode) and \
+                        not isinstance(dirent, unicode):
+                    # listdir() could not decode it
+                    self.logger.warning(
+                        'Skipping %s (unsupported filename encoding)'
+                        % repr(dirent))
+                    continue
+
+                fullpath = join(path, dirent)
+                if isdir(fullpath):
+                    if dirent in SCAN_SKIP_DIRECTORIES:
+                        continue
+
+                    if not self.followlinks and islink(fullpath):
+                        # honor followlinks
+                        continue
+
+                    pending.append(fullpath)
+
+                elif isfile(fullpath):
+                    files.append(fullpath)
+
+        return files
+
+    def read(self, timeout=None):
+        """
+        Waits up to timeout seconds (forever if None) for events and
+        returns them as a list of (path, mask) tuples.
+        """
+        try:
+            ready = select([self.fd], [], [], timeout)[0]
+
+        except (OSError, IOError) as e:
+            if e.args[0] == errno.EINTR:
+                return []
+            raise
+
+        if not ready:
+            return []
+
+        data = os_read(self.fd, 65536)
+        events = []
+        offset = 0
+        while offset + INOTIFY_EVENT_SIZE <= len(data):
+            wd, mask, cookie, length = unpack(
+                INOTIFY_EVENT_FORMAT,
+                data[offset:offset + INOTIFY_EVENT_SIZE],
+            )
+            offset += INOTIFY_EVENT_SIZE
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+
+            path = self.watches.get(wd)
+            if path is None:
+                continue
+
+            if mask & IN_IGNORED:
+                # The watch was removed (along with its directory)
+                del self.watches[wd]
+                self.descriptors.pop(path, None)
+                continue
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # The directory is no longer where it was
+                continue
+
+            if isinstance(path, unicode):
+                try:
+                    name = name.decode(self.encoding)
+
+                except UnicodeDecodeError:
+                    self.logger.warning(
+                        'Skipping %s (unsupported filename encoding)'
+                        % repr(name))
+                    continue
+
+            events.append((join(path, name), mask))
+
+        return events
+
+
 class SubliminalScript(SABPostProcessScript, PostProcessScript,
                        SchedulerScript):
     """A wrapper to Subliminal written for NZBGet
@@ -1174,48 +1796,572 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
                     basename(fname),
                     basename(old_fname),
                 )
-            )
-            try:
-                unlink(tmp_fname)
-            except:
-                pass
-            return False
+            )
+            try:
+                unlink(tmp_fname)
+            except:
+                pass
+            return False
+
+        try:
+            move(tmp_fname, fname)
+        except OSError:
+            self.logger.error(
+                'Could not move %s to %s' % (
+                    basename(tmp_fname),
+                    basename(fname),
+                )
+            )
+            try:
+                unlink(fname)
+            except:
+                pass
+            try:
+                move(old_fname, fname)
+            except:
+                pass
+            try:
+                unlink(tmp_fname)
+            except:
+                pass
+            return False
+
+        try:
+            unlink(old_fname)
+        except:
+            pass
+
+        self.logger.info(
+            "Converted %s to '%s' encoding." % (
+                basename(fname),
+                encoding,
+            )
+        )
+        return True
+
+    def guess_file(self, entry, lang, search_mode, cache_sub_dir,
+                   system_encoding, overwrite=False, shared=True,
+                   deobfuscate=True, use_nzbheaders=True):
+        """Guesses the video of a file and the languages it still needs
+        subtitles for.
+
+        Returns a tuple of the decoded path, the path to scan, the
+        languages and the video, or None if the file is skipped.
+        """
+        if True in [ v.match(entry) is not None \
+                    for v in IGNORE_FILELIST_RE ]:
+            self.logger.debug('Skipping - Ignored file: %s' % basename(entry))
+            return None
+
+        full_path = entry
+        if search_mode == SEARCH_MODE.BASIC:
+            full_path = join(cache_sub_dir, basename(entry))
+
+        # Figure out the encoding of the file
+        _entry = entry
+        detected_encoding = system_encoding
+        if isinstance(entry, str):
+            try:
+                _entry = entry.decode(detected_encoding)
+
+            except UnicodeError:
+                decoded = detect(entry)
+                detected_encoding = decoded['encoding']
+                self.logger.debug(
+                    'Detected %s file encoding' % detected_encoding,
+                )
+                try:
+                    _entry = entry.decode(detected_encoding)
+
+                except UnicodeError:
+                    # We failed to decode our file
+                    self.logger.debug(
+                        'Skipping - Unknown character encoding: %s' % \
+                        basename(entry))
+                    return None
+
+        # We want our file to be encoded for
+        # Create a copy of the lang object
+        _lang = set(lang)
+        if not overwrite:
+            # look in the directory (listed once for all the videos it
+            # holds) and extract all matches
+            try:
+                srt_dir = get_subtitle_directory(dirname(_entry))
+
+            except OSError:
+                self.logger.warning(
+                    'Could not list directory %s' % dirname(_entry),
+                )
+                srt_dir = None
+
+            for l in lang:
+                # Check that file doesn't already exist
+                if srt_dir is None:
+                    break
+
+                _matches = srt_dir.find_subtitles(
+                    basename(_entry),
+                    set([l.alpha3t, l.alpha3b, l.alpha2]),
+                )
+                if len(_matches):
+                    self.logger.debug(
+                        '%s subtitle match: %s' % (
+                            str(l),
+                            ', '.join(_matches),
+                    ))
+                    _lang.remove(l)
+                    continue
+
+        if len(_lang) == 0:
+            self.logger.debug(
+                'Skipping - Subtitle(s) already exist for: %s' % (
+                basename(_entry),
+            ))
+
+            return None
+
+        self.logger.debug('Scanning [%s] using %s lang=%s' % (
+            search_mode,
+            full_path,
+            ', '.join([ str(l) for l in _lang ]),
+        ))
+
+        # Before we start our scan, we want to strip out any information
+        # in the directory that may obstruct our results since the directory
+        # information is sometimes used to help figure out things.
+        filename = split(_entry)[1]
+        matches = DETECT_TVSHOW_RE.match(filename)
+        if matches:
+            # Enforce TV Show (use last 2 directories)
+            _prevew = os_sep.join(_entry.split(os_sep)[-3:])
+
+        else:
+            # Enforce Movie (use last directory only)
+            _prevew = os_sep.join(_entry.split(os_sep)[-2:])
+
+        try:
+            # Add Guessed Information
+            video = Video.fromguess(
+                filename,
+                self.guess_info(
+                    _prevew,
+                    shared=shared,
+                    deobfuscate=deobfuscate,
+                    use_nzbheaders=use_nzbheaders,
+                ),
+            )
+        except ValueError as e:
+            # fromguess() throws a ValueError if show matches couldn't
+            # be detected using the content guessit matched.
+            if isinstance(e, basestring):
+                self.logger.debug('Error message: %s' % e)
+
+            self.logger.warning(
+                'Skipping - Invalid file: %s' % basename(_entry),
+            )
+            return None
+
+        return (_entry, full_path, _lang, video)
+
+    def probe_file(self, guessed, overwrite=False, ignore_embedded=False,
+                   episode_hashes=None, movie_hashes=None,
+                   compute_hashes=False):
+        """Deep (enzyme) scan of a file returned by guess_file()
+
+        The episode_hashes (movie_hashes) are the names of the hashes the
+        providers of episodes (movies) use; only they can be computed, and
+        only when first used. All of them can be if None.
+
+        If compute_hashes is set they are computed here instead, unless
+        the video is not going to be searched (it already has subtitles
+        in all of its languages).
+
+        Returns a tuple of the decoded path, the languages and the video.
+        """
+        _entry, full_path, _lang, video = guessed
+
+        # Deep Enzyme Scan
+        video = scan_video(
+            full_path,
+            subtitles=not overwrite,
+            embedded_subtitles=not ignore_embedded,
+            video=video,
+            hashes=episode_hashes if isinstance(video, Episode) \
+            else movie_hashes,
+        )
+
+        if compute_hashes and isinstance(video.hashes, VideoHashes):
+            found = set(video.subtitle_languages)
+            if ignore_embedded or (
+                    babelfish.Language('und') not in found and
+                    not set(_lang) <= found):
+                video.hashes.compute()
+
+        return (_entry, _lang, video)
+
+    def scan_files(self, paths, suffix_filter):
+        """Returns the files of the scan directories matching the
+        suffix filter (as get_files() does with fullstats set).
+
+        The directories are walked incrementally using the scan journal
+        kept in the cache directory (see ScanJournal and FullScanInterval).
+        """
+        try:
+            interval = int(self.get(
+                'FullScanInterval', DEFAULT_FULL_SCAN_INTERVAL))
+        except (ValueError, TypeError):
+            interval = DEFAULT_FULL_SCAN_INTERVAL
+
+        cache_dir = self.get('CACHEDIR', self.get('TEMPDIR'))
+        if interval <= 0 or not cache_dir:
+            # Always a full scan
+            return self.get_files(
+                paths,
+                suffix_filter=suffix_filter,
+                fullstats=True,
+            )
+
+        # Files are not walked; they're handled by get_files()
+        directories = [p for p in paths if isdir(p)]
+        files = {}
+        if len(directories) != len(paths):
+            files.update(self.get_files(
+                [p for p in paths if not isdir(p)],
+                suffix_filter=suffix_filter,
+                fullstats=True,
+            ))
+
+        if not directories:
+            return files
+
+        if not isdir(cache_dir):
+            try:
+                makedirs(cache_dir)
+            except:
+                self.logger.warning('Could not create directory %s' % (
+                    cache_dir,
+                ))
+                # Always a full scan
+                files.update(self.get_files(
+                    directories,
+                    suffix_filter=suffix_filter,
+                    fullstats=True,
+                ))
+                return files
+
+        journal = ScanJournal(
+            join(cache_dir, SCAN_JOURNAL_FILE),
+            interval=interval,
+            logger=self.logger,
+        )
+        journal.load()
+        files.update(journal.scan(
+            directories, self.parse_list(suffix_filter)))
+        journal.save()
+
+        return files
+
+    def analyze_files(self, files, lang, search_mode, cache_sub_dir,
+                      system_encoding, overwrite=False, ignore_embedded=False,
+                      shared=True, deobfuscate=True, use_nzbheaders=True,
+                      episode_hashes=None, movie_hashes=None):
+        """A generator of the local analysis of the files, in order.
+
+        Every file yields either None if it is skipped or a tuple of the
+        decoded path, the languages and the video.
+
+        With more than one worker (see Workers) the files are guessed by a
+        pool of processes (guessit is CPU bound) and probed by a pool of
+        threads (enzyme and the hashes the providers use are I/O bound),
+        both running ahead of the consumer. The log output of the workers
+        is held back and emitted in order as each result is yielded.
+        """
+        guess_kwargs = {
+            'lang': lang,
+            'search_mode': search_mode,
+            'cache_sub_dir': cache_sub_dir,
+            'system_encoding': system_encoding,
+            'overwrite': overwrite,
+            'shared': shared,
+            'deobfuscate': deobfuscate,
+            'use_nzbheaders': use_nzbheaders,
+        }
+        probe_kwargs = {
+            'overwrite': overwrite,
+            'ignore_embedded': ignore_embedded,
+            'episode_hashes': episode_hashes,
+            'movie_hashes': movie_hashes,
+        }
+        probe = search_mode == SEARCH_MODE.ADVANCED
+
+        try:
+            workers = int(self.get('Workers', DEFAULT_WORKERS))
+        except (ValueError, TypeError):
+            workers = DEFAULT_WORKERS
+
+        if workers <= 1 or len(files) <= 1:
+            # Serial analysis
+            for entry in files:
+                guessed = self.guess_file(entry, **guess_kwargs)
+                if guessed is None:
+                    yield None
+
+                elif probe:
+                    yield self.probe_file(guessed, **probe_kwargs)
+
+                else:
+                    yield (guessed[0], guessed[2], guessed[3])
+            return
+
+        self.logger.debug('Analyzing %d file(s) with %d workers' % (
+            len(files), workers))
+
+        # Hold back the log records of the workers
+        capture = LogCapture()
+        handlers = set(self.logger.handlers) | \
+            set(logging.getLogger('subliminal').handlers)
+        for handler in handlers:
+            handler.addFilter(capture)
+
+        # The hashes are computed ahead too rather than when the providers
+        # first use them
+        probe_kwargs = dict(probe_kwargs, compute_hashes=True)
+
+        # The worker processes are forked and inherit the analysis
+        global _analysis
+        _analysis = (self, capture, guess_kwargs, probe_kwargs)
+
+        if not sys.platform.startswith('win'):
+            guess_pool = multiprocessing.Pool(workers)
+        else:
+            # No fork; the guesses are done in threads instead
+            guess_pool = ThreadPool(workers)
+        probe_pool = ThreadPool(workers) if probe else None
+
+        try:
+            results = guess_pool.imap(_guess_file_worker, files)
+            if probe:
+                results = probe_pool.imap(_probe_file_worker, results)
+
+            for result, records in results:
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+
+                if result is not None and not probe:
+                    result = (result[0], result[2], result[3])
+                yield result
+
+        finally:
+            guess_pool.terminate()
+            if probe_pool is not None:
+                probe_pool.terminate()
+
+            _analysis = None
+            for handler in handlers:
+                handler.removeFilter(capture)
+
+    def fetch_batch(self, batch, cache_sub_dir, apprise,
+                    provider_configs=None, single_mode=True, min_score=0,
+                    hearing_impaired=None, hi_score_adjust=0,
+                    force_encoding=None, tidy_subtitle=False, throttle=0):
+        """Downloads and places the best subtitles of a batch of videos.
+
+        The batch is a list of (entry, languages, video, providers) tuples.
+        The videos sharing their providers are searched for together so
+        that the providers able to search for several videos in a single
+        request (OpenSubtitles) can do so. The connections are throttled for
+        `throttle` seconds once the batch is downloaded.
+
+        Returns the number of subtitles placed.
+        """
+        # Group the videos; equal videos (the same episode or movie) can't
+        # be told apart within a group (and their subtitles are downloaded
+        # to the same file)
+        groups = []
+        for entry, lang, video, providers in batch:
+            for _providers, _entries in groups:
+                if _providers == providers and \
+                        video not in [e[2] for e in _entries]:
+                    _entries.append((entry, lang, video))
+                    break
+            else:
+                groups.append((providers, [(entry, lang, video)]))
+
+        f_count = 0
+        for providers, entries in groups:
+            # Search for the languages any of the videos needs; the others
+            # are the ones each video already has
+            languages = set()
+            for entry, lang, video in entries:
+                languages |= lang
+            for entry, lang, video in entries:
+                video.subtitle_languages |= languages - lang
+
+            subtitles = download_best_subtitles(
+                [e[2] for e in entries],
+                languages,
+                providers=providers,
+                provider_configs=provider_configs,
+                single=single_mode,
+                min_score=min_score,
+                hearing_impaired=hearing_impaired,
+                hi_score_adjust=hi_score_adjust,
+            )
+
+            for entry, lang, video in entries:
+                if not subtitles.get(video):
+                    self.logger.warning(
+                        'No subtitles were found for %s' % basename(entry))
+                    continue
+
+                f_count += self.place_subtitles(
+                    entry,
+                    lang,
+                    cache_sub_dir,
+                    apprise,
+                    single_mode=single_mode,
+                    force_encoding=force_encoding,
+                    tidy_subtitle=tidy_subtitle,
+                )
+
+        if throttle > 0:
+            self.logger.info('Throttling connection for %ds' % throttle)
+            sleep(throttle)
+
+        return f_count
+
+    def place_subtitles(self, entry, lang, cache_sub_dir, apprise,
+                        single_mode=True, force_encoding=None,
+                        tidy_subtitle=False):
+        """Places the subtitles downloaded for the video of an entry next to
+        it, converts and tidies them (if set to do so) and notifies of them.
+
+        Returns the number of subtitles placed.
+        """
+        f_count = 0
+
+        # The subtitles are placed next to the video
+        clear_subtitle_directories(dirname(entry))
+
+        for l in lang:
+            srt_path = abspath(dirname(entry))
+            srt_file = basename(splitext(entry)[0])
+            srt_lang = l.alpha2
+
+            if single_mode:
+                expected_file = join(srt_path, '%s.srt' % srt_file)
+
+            else:
+                expected_file = join(srt_path, '%s.%s.srt' % (
+                    srt_file, srt_lang,
+                ))
+
+            self.logger.debug('Expecting .srt: %s' % expected_file)
+
+            # Provide other possible locations (unique list)
+            potential_files = list(set([ \
+                p for p in [
+                    join(abspath(getcwd()), basename(expected_file)),
+                    join(cache_sub_dir, basename(expected_file)),
+                ] if isfile(p) and p != expected_file
+            ]))
+
+            if self.debug:
+                # Helpful information
+                for potential in potential_files:
+                    self.logger.debug(
+                        'Potential .srt: %s' % potential
+                    )
+
+            if isfile(expected_file):
+                # File was found in the same folder as the movie is
+                # no change is nessisary
+                pass
+
+            elif len(potential_files):
+                # Pop the first item from the potential list
+                while len(potential_files):
+                    move_from = potential_files.pop()
+                    self.logger.debug(
+                        'Expected not found, retrieving: %s' % move_from,
+                    )
+
+                    try:
+                        # Move our file
+                        move(move_from, expected_file)
+
+                        # Move our fetched file to it's final destination
+                        self.logger.info('Successfully placed %s' % \
+                                         basename(expected_file))
+                        # leave loop
+                        break
+
+                    except OSError as e:
+                        self.logger.error(
+                            'Could not move %s to %s' % (
+                                basename(move_from),
+                                expected_file,
+                            )
+                        )
+                        self.logger.debug(
+                            'move() exception: %s' % str(e),
+                        )
+
+            # Remove any lingering potential files
+            try:
+                expected_stat = stat(expected_file)
+            except OSError:
+                # weird, expected file was not found..
+                expected_stat = ()
+
+            while len(potential_files):
+                p = potential_files.pop()
+                try:
+                    if stat(f) != expected_stat:
+                        # non-linked files... proceed
+                        unlink(p)
+                        self.logger.debug(
+                            'Removed lingering extra: %s' % \
+                            p,
+                        )
+                except:
+                    pass
+
+            if not isfile(expected_file):
+                # We can't find anything
+                self.logger.error(
+                    'Could not locate a fetched (%s) subtitle.' % l
+                )
+                continue
+
+            # File Conversion Option
+            if force_encoding:
+                self.convert_encoding(
+                    expected_file,
+                    force_encoding,
+                    srt_lang,
+                )
 
-        try:
-            move(tmp_fname, fname)
-        except OSError:
-            self.logger.error(
-                'Could not move %s to %s' % (
-                    basename(tmp_fname),
-                    basename(fname),
+            # Post Processing Tidying
+            if tidy_subtitle:
+                self.tidy_subtitle(
+                    expected_file,
                 )
-            )
-            try:
-                unlink(fname)
-            except:
-                pass
-            try:
-                move(old_fname, fname)
-            except:
-                pass
-            try:
-                unlink(tmp_fname)
-            except:
-                pass
-            return False
 
-        try:
-            unlink(old_fname)
-        except:
-            pass
+            # increment counter
+            f_count += 1
 
-        self.logger.info(
-            "Converted %s to '%s' encoding." % (
-                basename(fname),
-                encoding,
+            title = "Subtitle Retrieved: %s" % basename(expected_file)
+            body = "## Subtitle Location\n%s" % abspath(expected_file)
+
+            # Perform any notifications (if set to do so)
+            apprise.notify(
+                body=body, title=title, notify_type=NotifyType.INFO,
+                body_format=NotifyFormat.MARKDOWN,
             )
-        )
-        return True
+
+        return f_count
 
     def subliminal_fetch(self, files, single_mode=True, shared=True,
                          deobfuscate=True, use_nzbheaders=True,
@@ -1362,15 +2508,20 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
                 'password': _addic7ed_pass,
             }
 
+        # The OpenSubtitles session is reused across runs
+        provider_configs['opensubtitles'] = {
+            'token_file': join(cache_dir, OPENSUBTITLES_TOKEN_FILE),
+        }
+
         _opensubs_user = self.get('OpenSubtitlesUser')
         _opensubs_pass = self.get('OpenSubtitlesPass')
         if _opensubs_user and _opensubs_pass:
             # Only if the credentials are set should we initialize
             # them with the provider
-            provider_configs['opensubtitles'] = {
+            provider_configs['opensubtitles'].update({
                 'username': _opensubs_user,
                 'password': _opensubs_pass,
-            }
+            })
 
         lang = self.parse_list(self.get('Languages', 'en'))
         if not lang:
@@ -1502,16 +2653,23 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
                     del xref_paths[key]
                     continue
 
-        # Configure cache
-        cache_region.configure(
-            'dogpile.cache.dbm',
-            expiration_time=timedelta(days=30),
-            arguments={'filename': cache_file, 'lock_factory': MutexLock},
-        )
+        # Directories are listed once per run
+        clear_subtitle_directories()
+
+        # Configure cache (once; the watch mode fetches over and over)
+        if not cache_region.is_configured:
+            cache_region.configure(
+                'dogpile.cache.dbm',
+                expiration_time=timedelta(days=30),
+                arguments={'filename': cache_file, 'lock_factory': MutexLock},
+            )
 
         # initialize fetch counter
         f_count = 0
 
+        # The videos waiting for their subtitles to be downloaded
+        batch = []
+
         # Default system encoding
         system_encoding = self.get('SystemEncoding', DEFAULT_SYSTEM_ENCODING)
 
@@ -1525,143 +2683,44 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
         throttle = int(self.get(
             'Throttle', DEFAULT_THROTTLE_WAITTIME))
 
-        for entry in files:
-            if True in [ v.match(entry) is not None \
-                        for v in IGNORE_FILELIST_RE ]:
-                self.logger.debug('Skipping - Ignored file: %s' % basename(entry))
-                continue
-
-            full_path = entry
-            if search_mode == SEARCH_MODE.BASIC:
-                full_path = join(cache_sub_dir, basename(entry))
-
-            # Figure out the encoding of the file
-            detected_encoding = system_encoding
-            if isinstance(entry, str):
-                try:
-                    _entry = entry.decode(detected_encoding)
-
-                except UnicodeError:
-                    decoded = detect(entry)
-                    detected_encoding = decoded['encoding']
-                    self.logger.debug(
-                        'Detected %s file encoding' % detected_encoding,
-                    )
-                    try:
-                        _entry = entry.decode(detected_encoding)
-
-                    except UnicodeError:
-                        # We failed to decode our file
-                        self.logger.debug(
-                            'Skipping - Unknown character encoding: %s' % \
-                            basename(entry))
-
-            # We want our file to be encoded for
-            # Create a copy of the lang object
-            _lang = set(lang)
-            for l in lang:
-                # Check that file doesn't already exist
-                srt_path = dirname(_entry)
-                srt_file = basename(splitext(_entry)[0])
-                srt_file_re = re.escape(srt_file)
-                if l.alpha3t == l.alpha3b:
-                    srt_regex = '^(%s(\.(%s|%s))?.(idx|sub|srt))$' % (
-                        srt_file_re, l.alpha3t, l.alpha2,
-                    )
-                else:
-                    srt_regex = '^(%s(\.(%s|%s|%s))?.(idx|sub|srt))$' % (
-                        srt_file_re, l.alpha3t, l.alpha3b, l.alpha2,
-                    )
-
-                # look in the directory and extract all matches
-                _matches = self.get_files(
-                    search_dir=srt_path,
-                    regex_filter=srt_regex,
-                    max_depth=1,
-                )
-                if not overwrite and len(_matches):
-                    self.logger.debug(
-                        '%s subtitle match: %s' % (
-                            str(l),
-                            ', '.join([ basename(_srt) \
-                                       for _srt in _matches.keys() ]),
-                    ))
-                    _lang.remove(l)
-                    continue
+        # The videos of a batch are all searched for in a row; when
+        # throttling, a batch holds no more videos than the threshold and the
+        # throttle occurs after each of them
+        batch_size = SEARCH_BATCH_SIZE
+        if search_mode == SEARCH_MODE.ADVANCED and \
+                throttle_threshold is not None and throttle > 0:
+            batch_size = min(batch_size, throttle_threshold)
 
-            if len(_lang) == 0:
-                self.logger.debug(
-                    'Skipping - Subtitle(s) already exist for: %s' % (
-                    basename(_entry),
-                ))
+        else:
+            throttle = 0
+
+        # Analyze the files locally (guessing and, in advanced mode, probing
+        # the videos); a pool of workers does it ahead of the searches when
+        # more than one worker is set
+        analyses = self.analyze_files(
+            files,
+            lang,
+            search_mode,
+            cache_sub_dir=cache_sub_dir,
+            system_encoding=system_encoding,
+            overwrite=overwrite,
+            ignore_embedded=ignore_embedded,
+            shared=shared,
+            deobfuscate=deobfuscate,
+            use_nzbheaders=use_nzbheaders,
+            # Only the hashes the providers use are computed
+            episode_hashes=get_provider_hashes(tvshow_providers),
+            movie_hashes=get_provider_hashes(movie_providers),
+        )
 
+        for analysis in analyses:
+            if analysis is None:
+                # Skipped
                 continue
 
-            self.logger.debug('Scanning [%s] using %s lang=%s' % (
-                search_mode,
-                full_path,
-                ', '.join([ str(l) for l in _lang ]),
-            ))
-
-            # Before we start our scan, we want to strip out any information
-            # in the directory that may obstruct our results since the directory
-            # information is sometimes used to help figure out things.
-            filename = split(_entry)[1]
-            matches = DETECT_TVSHOW_RE.match(filename)
-            if matches:
-                # Enforce TV Show (use last 2 directories)
-                _prevew = os_sep.join(_entry.split(os_sep)[-3:])
-
-            else:
-                # Enforce Movie (use last directory only)
-                _prevew = os_sep.join(_entry.split(os_sep)[-2:])
-
-            try:
-                # Add Guessed Information
-                video = Video.fromguess(
-                    filename,
-                    self.guess_info(
-                        _prevew,
-                        shared=shared,
-                        deobfuscate=deobfuscate,
-                        use_nzbheaders=use_nzbheaders,
-                    ),
-                )
-            except ValueError as e:
-                # fromguess() throws a ValueError if show matches couldn't
-                # be detected using the content guessit matched.
-                if isinstance(e, basestring):
-                    self.logger.debug('Error message: %s' % e)
-
-                self.logger.warning(
-                    'Skipping - Invalid file: %s' % basename(_entry),
-                )
-                continue
+            _entry, _lang, video = analysis
 
             if search_mode == SEARCH_MODE.ADVANCED:
-                # Deep Enzyme Scan
-                video = scan_video(
-                    full_path,
-                    subtitles=not overwrite,
-                    embedded_subtitles=not ignore_embedded,
-                    video=video,
-                )
-                if throttle_threshold is not None and throttle > 0:
-                    # Calculate our threshold
-                    if throttle_threshold > 0:
-                        # Adjust
-                        throttle_threshold -= 1
-
-                    if throttle_threshold <= 0:
-                        # Throttle
-                        self.logger.info(
-                            'Throttling connection for %ds' % throttle)
-                        sleep(throttle)
-
-                        # Reset our threshold value
-                        throttle_threshold = int(self.get(
-                            'ThrottleThreshold', DEFAULT_THROTTLE_THRESHOLD))
-
                 if babelfish.Language('und') in video.subtitle_languages:
                     # This means we found embedded subtitles, it causes the
                     # download_best_subtitles() to skip over this because of
@@ -1765,6 +2824,9 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
                         # Remove entry (since we matched it already now)
                         del xref_paths[key]
 
+                        # The directory content changed
+                        clear_subtitle_directories(srt_path)
+
                 if local_match:
                     # increment counter
                     f_count += 1
@@ -1781,138 +2843,65 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
                     # Go back to top; we're done
                     continue
 
-            # download best subtitles
-            subtitles = download_best_subtitles(
-                [video, ],
-                _lang,
-                providers=providers,
+            # Videos are only known by their filename to subliminal (which
+            # downloads their subtitles to a file named after it); one sharing
+            # its filename with a video of the batch waits for the next batch
+            if basename(video.name) in [basename(b[2].name) for b in batch]:
+                f_count += self.fetch_batch(
+                    batch,
+                    cache_sub_dir,
+                    a,
+                    provider_configs=provider_configs,
+                    single_mode=single_mode,
+                    min_score=minscore,
+                    hearing_impaired=hearing_impaired,
+                    hi_score_adjust=hi_score_adjust,
+                    force_encoding=force_encoding,
+                    tidy_subtitle=tidy_subtitle,
+                    throttle=throttle,
+                )
+                batch = []
+
+            # download best subtitles (along with those of the next videos)
+            batch.append((_entry, _lang, video, providers))
+            if len(batch) < batch_size:
+                continue
+
+            f_count += self.fetch_batch(
+                batch,
+                cache_sub_dir,
+                a,
                 provider_configs=provider_configs,
-                single=single_mode,
+                single_mode=single_mode,
                 min_score=minscore,
                 hearing_impaired=hearing_impaired,
                 hi_score_adjust=hi_score_adjust,
+                force_encoding=force_encoding,
+                tidy_subtitle=tidy_subtitle,
+                throttle=throttle,
             )
+            batch = []
 
-            if not subtitles:
-                self.logger.warning('No subtitles were found for %s' % basename(_entry))
-                continue
-
-            for l in _lang:
-                srt_path = abspath(dirname(_entry))
-                srt_file = basename(splitext(_entry)[0])
-                srt_lang = l.alpha2
-
-                if single_mode:
-                    expected_file = join(srt_path, '%s.srt' % srt_file)
-
-                else:
-                    expected_file = join(srt_path, '%s.%s.srt' % (
-                        srt_file, srt_lang,
-                    ))
-
-                self.logger.debug('Expecting .srt: %s' % expected_file)
-
-                # Provide other possible locations (unique list)
-                potential_files = list(set([ \
-                    p for p in [
-                        join(abspath(getcwd()), basename(expected_file)),
-                        join(cache_sub_dir, basename(expected_file)),
-                    ] if isfile(p) and p != expected_file
-                ]))
-
-                if self.debug:
-                    # Helpful information
-                    for potential in potential_files:
-                        self.logger.debug(
-                            'Potential .srt: %s' % potential
-                        )
-
-                if isfile(expected_file):
-                    # File was found in the same folder as the movie is
-                    # no change is nessisary
-                    pass
-
-                elif len(potential_files):
-                    # Pop the first item from the potential list
-                    while len(potential_files):
-                        move_from = potential_files.pop()
-                        self.logger.debug(
-                            'Expected not found, retrieving: %s' % move_from,
-                        )
-
-                        try:
-                            # Move our file
-                            move(move_from, expected_file)
-
-                            # Move our fetched file to it's final destination
-                            self.logger.info('Successfully placed %s' % \
-                                             basename(expected_file))
-                            # leave loop
-                            break
-
-                        except OSError as e:
-                            self.logger.error(
-                                'Could not move %s to %s' % (
-                                    basename(move_from),
-                                    expected_file,
-                                )
-                            )
-                            self.logger.debug(
-                                'move() exception: %s' % str(e),
-                            )
-
-                # Remove any lingering potential files
-                try:
-                    expected_stat = stat(expected_file)
-                except OSError:
-                    # weird, expected file was not found..
-                    expected_stat = ()
-
-                while len(potential_files):
-                    p = potential_files.pop()
-                    try:
-                        if stat(f) != expected_stat:
-                            # non-linked files... proceed
-                            unlink(p)
-                            self.logger.debug(
-                                'Removed lingering extra: %s' % \
-                                p,
-                            )
-                    except:
-                        pass
-
-                if not isfile(expected_file):
-                    # We can't find anything
-                    self.logger.error(
-                        'Could not locate a fetched (%s) subtitle.' % l
-                    )
-                    continue
-
-                # File Conversion Option
-                if force_encoding:
-                    self.convert_encoding(
-                        expected_file,
-                        force_encoding,
-                        srt_lang,
-                    )
-
-                # Post Processing Tidying
-                if tidy_subtitle:
-                    self.tidy_subtitle(
-                        expected_file,
-                    )
-
-                # increment counter
-                f_count += 1
-
-                title = "Subtitle Retrieved: %s" % basename(expected_file)
-                body = "## Subtitle Location\n%s" % abspath(expected_file)
+        if batch:
+            f_count += self.fetch_batch(
+                batch,
+                cache_sub_dir,
+                a,
+                provider_configs=provider_configs,
+                single_mode=single_mode,
+                min_score=minscore,
+                hearing_impaired=hearing_impaired,
+                hi_score_adjust=hi_score_adjust,
+                force_encoding=force_encoding,
+                tidy_subtitle=tidy_subtitle,
+            )
 
-                # Perform any notifications (if set to do so)
-                a.notify(
-                    body=body, title=title, notify_type=NotifyType.INFO,
-                    body_format=NotifyFormat.MARKDOWN,
-                )
+        # The provider sessions are kept for the next run (in watch mode);
+        # report how well their connections were reused so far
+        for host, stats in provider_sessions.stats().items():
+            self.logger.debug('%s: %d request(s) over %d connection(s)' % (
+                host, stats['requests'], stats['connections'],
+            ))
 
         # When you're all done handling the file, just return
         # the error code that best represents how everything worked
@@ -2063,11 +3052,7 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
             self.get('Single', DEFAULT_SINGLE))
 
         # Fetch Scan Paths
-        files = self.get_files(
-            paths,
-            suffix_filter=video_extension,
-            fullstats=True,
-        )
+        files = self.scan_files(paths, suffix_filter=video_extension)
 
         # Apply Filters
         ref_time = datetime.now() - timedelta(hours=maxage)
@@ -2118,6 +3103,15 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
     def main(self, *args, **kwargs):
         """CLI
         """
+        result = self.cli_scan()
+        if not self.parse_bool(self.get('Watch', False)):
+            return result
+
+        return self.watch_main()
+
+    def cli_scan(self):
+        """A single scan of the scan directories
+        """
         # Environment
         video_extension = self.get('VideoExtensions', DEFAULT_EXTENSIONS)
         maxage = int(self.get('MaxAge', DEFAULT_MAXAGE))
@@ -2134,11 +3128,7 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
             self.get('Single', DEFAULT_SINGLE))
 
         # Fetch Scan Paths
-        files = self.get_files(
-            paths,
-            suffix_filter=video_extension,
-            fullstats=True,
-        )
+        files = self.scan_files(paths, suffix_filter=video_extension)
 
         # Apply Filters
         if not force:
@@ -2191,6 +3181,118 @@ class SubliminalScript(SABPostProcessScript, PostProcessScript,
             )
             return None
 
+    def watch_main(self):
+        """Watches the scan directories and fetches the subtitles of the
+        videos written or moved into them as they arrive.
+
+        A video is only handled once it was left alone for WatchDelay
+        seconds so that it is not scanned while it is being copied over
+        (or while the rest of its release is).
+        """
+        video_extension = tuple(
+            e.lower() for e in self.parse_list(
+                self.get('VideoExtensions', DEFAULT_EXTENSIONS)))
+        minsize = int(self.get('MinSize', DEFAULT_MIN_VIDEO_SIZE_MB)) * 1048576
+        delay = int(self.get('WatchDelay', DEFAULT_WATCH_DELAY))
+        paths = self.parse_path_list(self.get('ScanDirectories'))
+        paths += self.get('AbsoluteScanDirectories', [])
+        paths = [abspath(p) for p in paths if isdir(p)]
+
+        # Single Mode (don't download language extension)
+        single_mode = self.parse_bool(
+            self.get('Single', DEFAULT_SINGLE))
+
+        if not paths:
+            self.logger.error('There are no directories to watch.')
+            return False
+
+        try:
+            watcher = InotifyWatcher(logger=self.logger)
+
+        except OSError as e:
+            self.logger.error('Could not watch the scan directories.')
+            self.logger.debug('Reason %s' % str(e))
+            return False
+
+        for path in paths:
+            # Their content was handled by the scan done before
+            watcher.add_tree(path)
+
+        self.logger.info('Watching %d directories (%d in total).' % (
+            len(paths), len(watcher.watches)))
+
+        # The videos waiting to settle, with the time of their last event
+        pending = {}
+        try:
+            while True:
+                timeout = None
+                if pending:
+                    timeout = max(0, min(pending.values()) + delay - time())
+
+                events = watcher.read(timeout)
+                now = time()
+                for path, mask in events:
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost, catch up with a scan
+                        self.logger.warning(
+                            'Too many changes at once, scanning instead.')
+                        self.cli_scan()
+                        continue
+
+                    if mask & IN_ISDIR:
+                        if mask & (IN_CREATE | IN_MOVED_TO):
+                            for _path in watcher.add_tree(path):
+                                if _path.lower().endswith(video_extension):
+                                    pending[_path] = now
+                        continue
+
+                    if not path.lower().endswith(video_extension):
+                        continue
+
+                    if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        self.logger.debug('Detected %s' % path)
+                        pending[path] = now
+
+                    elif mask & IN_MODIFY and path in pending:
+                        # Still being written (it was found in a new
+                        # directory); it is queued again once closed
+                        del pending[path]
+
+                files = []
+                for path, last_event in pending.items():
+                    if now - last_event < delay:
+                        continue
+
+                    del pending[path]
+                    try:
+                        if stat(path)[ST_SIZE] < minsize:
+                            self.logger.debug('Filtered "%s"' % path)
+                            continue
+
+                    except OSError:
+                        # Removed since
+                        continue
+
+                    files.append(path)
+
+                if files:
+                    self.logger.info('Found %d new file(s).' % len(files))
+                    self.subliminal_fetch(
+                        sorted(files),
+                        single_mode=single_mode,
+                        shared=False,
+                        deobfuscate=False,
+                        use_nzbheaders=False,
+                    )
+
+        except KeyboardInterrupt:
+            self.logger.info('No longer watching.')
+
+        finally:
+            watcher.close()
+
+        return True
+
 
 # Call your script as follows:
 if __name__ == "__main__":
@@ -2404,6 +3506,42 @@ if __name__ == "__main__":
         "defaults to %d." % DEFAULT_THROTTLE_WAITTIME,
         metavar="SEC",
     )
+    parser.add_option(
+        "-j",
+        "--workers",
+        dest="workers",
+        help="The number of workers analyzing the video files (guessing " + \
+        "their content and, in advanced search mode, hashing and reading " + \
+        "their headers) ahead of the subtitle searches. It currently " + \
+        "defaults to %d." % DEFAULT_WORKERS,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "-w",
+        "--watch",
+        action="store_true",
+        dest="watch",
+        help="Keep running after the scan and fetch the subtitles of the " + \
+        "videos as they arrive in the scan directories (Linux only).",
+    )
+    parser.add_option(
+        "--watch-delay",
+        dest="watch_delay",
+        help="The number of seconds a video must have been left alone " + \
+        "in watch mode before its subtitles are fetched. It currently " + \
+        "defaults to %d." % DEFAULT_WATCH_DELAY,
+        metavar="SECONDS",
+    )
+    parser.add_option(
+        "--full-scan-interval",
+        dest="full_scan_interval",
+        help="The scan directories are walked incrementally, only " + \
+        "listing the directories that changed since the last scan; " + \
+        "every HOURS hour(s) a full scan is done instead. Set this to " + \
+        "0 (zero) to always do a full scan. It currently defaults to " + \
+        "%d." % DEFAULT_FULL_SCAN_INTERVAL,
+        metavar="HOURS",
+    )
     parser.add_option(
         "-L",
         "--logfile",
@@ -2554,6 +3692,42 @@ if __name__ == "__main__":
                 except ConfigNoOption:
                     pass
 
+            if options.workers is None:
+                # Get Default
+                try:
+                    options.workers = \
+                        cfg.get(DEFAULTS_CONFIG_FILE_SECTION, 'Workers')
+
+                except ConfigNoOption:
+                    pass
+
+            if options.watch is None:
+                # Get Default
+                try:
+                    options.watch = script.parse_bool(
+                        cfg.get(DEFAULTS_CONFIG_FILE_SECTION, 'Watch'),
+                    )
+                except ConfigNoOption:
+                    pass
+
+            if options.watch_delay is None:
+                # Get Default
+                try:
+                    options.watch_delay = \
+                        cfg.get(DEFAULTS_CONFIG_FILE_SECTION, 'WatchDelay')
+
+                except ConfigNoOption:
+                    pass
+
+            if options.full_scan_interval is None:
+                # Get Default
+                try:
+                    options.full_scan_interval = cfg.get(
+                        DEFAULTS_CONFIG_FILE_SECTION, 'FullScanInterval')
+
+                except ConfigNoOption:
+                    pass
+
             if options.single_mode is None:
                 # Get Default
                 try:
@@ -2753,6 +3927,10 @@ if __name__ == "__main__":
     _notify_urls = options.notify_urls
     _throttle = options.throttle
     _threshold = options.threshold
+    _workers = options.workers
+    _full_scan_interval = options.full_scan_interval
+    _watch = options.watch is True
+    _watch_delay = options.watch_delay
 
     if _maxage is not None:
         try:
@@ -2809,6 +3987,41 @@ if __name__ == "__main__":
             )
             exit(EXIT_CODE.FAILURE)
 
+    if _workers is not None:
+        try:
+            _workers = abs(int(_workers))
+            script.set('Workers', _workers)
+        except (ValueError, TypeError):
+            script.logger.error(
+                'An invalid `workers` (%s) was specified.' % (_workers)
+            )
+            exit(EXIT_CODE.FAILURE)
+
+    if _watch_delay is not None:
+        try:
+            _watch_delay = abs(int(_watch_delay))
+            script.set('WatchDelay', _watch_delay)
+        except (ValueError, TypeError):
+            script.logger.error(
+                'An invalid `watch-delay` (%s) was specified.' % (
+                    _watch_delay)
+            )
+            exit(EXIT_CODE.FAILURE)
+
+    if _watch:
+        script.set('Watch', True)
+
+    if _full_scan_interval is not None:
+        try:
+            _full_scan_interval = abs(int(_full_scan_interval))
+            script.set('FullScanInterval', _full_scan_interval)
+        except (ValueError, TypeError):
+            script.logger.error(
+                'An invalid `full-scan-interval` (%s) was specified.' % (
+                    _full_scan_interval)
+            )
+            exit(EXIT_CODE.FAILURE)
+
     if _overwrite:
         script.set('Overwrite', True)
 
@@ -2869,6 +4082,15 @@ if __name__ == "__main__":
     if script.get('Throttle') is None:
         script.set('Throttle', DEFAULT_THROTTLE_WAITTIME)
 
+    if script.get('Workers') is None:
+        script.set('Workers', DEFAULT_WORKERS)
+
+    if script.get('WatchDelay') is None:
+        script.set('WatchDelay', DEFAULT_WATCH_DELAY)
+
+    if script.get('FullScanInterval') is None:
+        script.set('FullScanInterval', DEFAULT_FULL_SCAN_INTERVAL)
+
     if script.get('MaxAge') is None:
         script.set('MaxAge', DEFAULT_MAXAGE)
 
@@ -7,7 +7,9 @@ __copyright__ = 'Copyright 2013 Antoine Bertin'
 
 import logging
 from .exceptions import *
+from .avi import *
 from .mkv import *
+from .mp4 import *
 
 class NullHandler(logging.Handler):
     def emit(self, record):
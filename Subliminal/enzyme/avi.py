@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from .exceptions import MalformedAVIError
+from .mkv import VIDEO_TRACK, AUDIO_TRACK, SUBTITLE_TRACK, ProbedTrack
+from struct import unpack
+import logging
+
+
+__all__ = ['probe_avi_tracks']
+logger = logging.getLogger(__name__)
+
+
+# Maximum size of the hdrl list loaded in memory
+MAX_HEADER_SIZE = 256 * 1024
+
+# Stream types to track types mapping
+STREAM_TYPES = {
+    b'vids': VIDEO_TRACK,
+    b'auds': AUDIO_TRACK,
+    b'txts': SUBTITLE_TRACK
+}
+
+
+def iter_chunks(data, start=0, end=None):
+    """Iterate over the RIFF chunks held in `data` between `start` and `end`
+
+    :param bytes data: data of the parent list
+    :return: the id, start and end of the data of each chunk, the id of a LIST being its list type
+    :rtype: iterator of tuples
+
+    """
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        chunk_id, size = unpack('<4sL', data[position:position + 8])
+        chunk_start = position + 8
+        chunk_end = chunk_start + size
+        if chunk_end > end:
+            raise MalformedAVIError('Invalid size %d for %r chunk' % (size, chunk_id))
+        if chunk_id == b'LIST':
+            if size < 4:
+                raise MalformedAVIError('Invalid size %d for LIST' % size)
+            chunk_id = data[chunk_start:chunk_start + 4]
+            chunk_start += 4
+        yield chunk_id, chunk_start, chunk_end
+        # chunks are word aligned
+        position = chunk_end + (size & 1)
+
+
+def parse_strl(data, start, end):
+    """Parse a strl list in `data`
+
+    :return: the track or None if it is not a video, audio or subtitle stream
+    :rtype: :class:`~enzyme.mkv.ProbedTrack`
+
+    """
+    chunks = {}
+    for chunk_id, chunk_start, chunk_end in iter_chunks(data, start, end):
+        chunks.setdefault(chunk_id, data[chunk_start:chunk_end])
+    strh = chunks.get(b'strh', b'')
+    if len(strh) < 8:
+        return None
+    stream_type, handler = unpack('<4s4s', strh[:8])
+    track_type = STREAM_TYPES.get(stream_type)
+    if track_type is None:
+        return None
+    name = chunks.get(b'strn', b'').rstrip(b'\x00').decode('latin-1') or None
+
+    codec_id = width = height = interlaced = None
+    strf = chunks.get(b'strf', b'')
+    if track_type == VIDEO_TRACK:
+        # BITMAPINFOHEADER
+        if len(strf) >= 20:
+            width, height, compression = unpack('<ll2x2x4s', strf[4:20])
+            height = abs(height)
+            interlaced = False
+            codec_id = compression
+        if not codec_id or codec_id == b'\x00' * 4:
+            codec_id = handler
+        codec_id = codec_id.rstrip(b'\x00').decode('latin-1') or None
+    elif track_type == AUDIO_TRACK and len(strf) >= 2:
+        # WAVEFORMATEX
+        codec_id = '%#06x' % unpack('<H', strf[:2])[0]
+    return ProbedTrack(track_type, None, name, None, codec_id, width, height, interlaced)
+
+
+def probe_avi_tracks(stream, max_header_size=MAX_HEADER_SIZE):
+    """Read the tracks of an AVI file
+
+    Only the hdrl list at the start of the file is read, in a single read after the
+    RIFF header
+
+    :param stream: seekable file-like object
+    :param int max_header_size: maximum size of the hdrl list
+    :raise MalformedAVIError: when no hdrl list can be found or parsed
+    :return: the video, audio and subtitle tracks, with the FourCC as the `codec_id` of video
+        tracks and the hexadecimal format tag as the `codec_id` of audio tracks
+    :rtype: list of :class:`~enzyme.mkv.ProbedTrack`
+
+    """
+    header = stream.read(24)
+    if len(header) < 24:
+        raise MalformedAVIError('Truncated RIFF header')
+    riff, form, list_id, size, list_type = unpack('<4s4x4s4sL4s', header)
+    if riff != b'RIFF' or form != b'AVI ':
+        raise MalformedAVIError('Not an AVI file')
+    if list_id != b'LIST' or list_type != b'hdrl':
+        raise MalformedAVIError('No hdrl list found')
+    if size < 4:
+        raise MalformedAVIError('Invalid size %d for hdrl list' % size)
+    if size - 4 > max_header_size:
+        raise MalformedAVIError('hdrl list is too large (%d)' % size)
+    data = stream.read(size - 4)
+    if len(data) < size - 4:
+        raise MalformedAVIError('Truncated hdrl list')
+
+    tracks = []
+    strls = [(start, end) for chunk_id, start, end in iter_chunks(data) if chunk_id == b'strl']
+    for number, (start, end) in enumerate(strls):
+        track = parse_strl(data, start, end)
+        if track is None:
+            logger.debug('Skipping stream %d that is not a video, audio or subtitle stream', number)
+            continue
+        tracks.append(track._replace(number=number))
+    return tracks
@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-__all__ = ['Error', 'MalformedMKVError', 'ParserError', 'ReadError', 'SizeError']
+__all__ = ['Error', 'MalformedAVIError', 'MalformedMKVError', 'MalformedMP4Error', 'ParserError', 'ReadError', 'SizeError']
 
 
 class Error(Exception):
@@ -7,11 +7,21 @@ class Error(Exception):
     pass
 
 
+class MalformedAVIError(Error):
+    """Wrong or malformed chunk found"""
+    pass
+
+
 class MalformedMKVError(Error):
     """Wrong or malformed element found"""
     pass
 
 
+class MalformedMP4Error(Error):
+    """Wrong or malformed box found"""
+    pass
+
+
 class ParserError(Error):
     """Base class for exceptions in parsers"""
     pass
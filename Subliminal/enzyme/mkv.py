@@ -2,25 +2,41 @@
 from .exceptions import ParserError, MalformedMKVError
 from .parsers import ebml
 from datetime import timedelta
+import collections
 import logging
 
 
 __all__ = ['VIDEO_TRACK', 'AUDIO_TRACK', 'SUBTITLE_TRACK', 'MKV', 'Info', 'Track', 'VideoTrack',
-           'AudioTrack', 'SubtitleTrack', 'Tag', 'SimpleTag', 'Chapter']
+           'AudioTrack', 'SubtitleTrack', 'Tag', 'SimpleTag', 'Chapter', 'ProbedTrack', 'probe_tracks']
 logger = logging.getLogger(__name__)
 
 
 # Track types
 VIDEO_TRACK, AUDIO_TRACK, SUBTITLE_TRACK = 0x01, 0x02, 0x11
 
+# Id of the Tracks element
+TRACKS_ID = 0x1654AE6B
+
+# Number of bytes read at once at the start of the file, enough to hold the Info and Tracks of most files
+HEADER_SIZE = 1024 * 1024
+
+# Elements of the Tracks not needed by :func:`probe_tracks`
+PROBE_IGNORED_ELEMENTS = ['Void', 'CRC-32', 'CodecPrivate', 'ContentEncodings', 'TrackTranslate', 'TrackOperation']
+
 
 class MKV(object):
     """Matroska Video file
 
+    The `stream` is read through a :class:`~enzyme.parsers.ebml.WindowedStream` so that parsing
+    the metadata takes a handful of reads: one for the `header_size` first bytes and one per
+    element referenced by the SeekHead that lies outside of it
+
     :param stream: seekable file-like object
+    :param bool recurse_seek_head: parse the SeekHead elements referenced by the SeekHead
+    :param int header_size: number of bytes read at once at the start of the `stream`
 
     """
-    def __init__(self, stream, recurse_seek_head=False):
+    def __init__(self, stream, recurse_seek_head=False, header_size=HEADER_SIZE):
         # default attributes
         self.info = None
         self.video_tracks = []
@@ -33,6 +49,9 @@ class MKV(object):
         self.recurse_seek_head = recurse_seek_head
         self._parsed_positions = set()
 
+        if not isinstance(stream, ebml.WindowedStream):
+            stream = ebml.WindowedStream(stream, header_size)
+
         try:
             # get the Segment element
             logger.info('Reading Segment element')
@@ -352,3 +371,98 @@ class Chapter(object):
 
     def __repr__(self):
         return '<%s [%s, enabled=%s]>' % (self.__class__.__name__, self.start, self.enabled)
+
+
+class ProbedTrack(collections.namedtuple('ProbedTrack', ['type', 'number', 'name', 'language', 'codec_id',
+                                                         'width', 'height', 'interlaced'])):
+    """Compact track as returned by :func:`probe_tracks`, video fields are None for other tracks"""
+    __slots__ = ()
+
+    @classmethod
+    def fromelement(cls, element):
+        """Load the :class:`ProbedTrack` from an :class:`~enzyme.parsers.ebml.Element`
+
+        :param element: the TrackEntry element
+        :type element: :class:`~enzyme.parsers.ebml.Element`
+
+        """
+        width = height = interlaced = None
+        if 'Video' in element:
+            width = element['Video'].get('PixelWidth', 0)
+            height = element['Video'].get('PixelHeight', 0)
+            interlaced = bool(element['Video'].get('FlagInterlaced', False))
+        return cls(element.get('TrackType'), element.get('TrackNumber', 0), element.get('Name'),
+                   element.get('Language', 'eng'), element.get('CodecID'), width, height, interlaced)
+
+
+def probe_tracks(stream, header_size=HEADER_SIZE):
+    """Read only the tracks of a Matroska Video file
+
+    Unlike :class:`MKV`, only the Tracks element is read: it is found from the SeekHead or
+    by walking the elements of the Segment up to the first Cluster, and Info, Chapters and
+    Tags are left alone
+
+    :param stream: seekable file-like object
+    :param int header_size: number of bytes read at once at the start of the `stream`
+    :raise MalformedMKVError: when no Tracks element can be found or parsed
+    :return: the tracks
+    :rtype: list of :class:`ProbedTrack`
+
+    """
+    if not isinstance(stream, ebml.WindowedStream):
+        stream = ebml.WindowedStream(stream, header_size)
+    specs = ebml.get_matroska_specs()
+    try:
+        tracks = _find_tracks(stream, specs)
+        if tracks is None:
+            raise MalformedMKVError('No Tracks found')
+        tracks.load(stream, specs, ignore_element_names=PROBE_IGNORED_ELEMENTS)
+    except ParserError as e:
+        raise MalformedMKVError('Parsing error: %s' % e)
+    return [ProbedTrack.fromelement(t) for t in tracks if t.name == 'TrackEntry']
+
+
+def _find_tracks(stream, specs):
+    """Find the Tracks element and leave the `stream` at the position of its data
+
+    :return: the unloaded Tracks element or None
+
+    """
+    # get the Segment element
+    while True:
+        element = ebml.parse_element(stream, specs)
+        if element is None:
+            continue
+        if element.name == 'Segment':
+            segment = element
+            break
+        if element.type == ebml.MASTER:
+            stream.seek(element.size, 1)
+
+    # walk the children of the Segment, following the SeekHead if any
+    while stream.tell() < segment.position + segment.size:
+        element = ebml.parse_element(stream, specs)
+        if element is None:
+            continue
+        if element.name == 'Tracks':
+            return element
+        if element.name == 'Cluster':
+            logger.warning('Cluster found before Tracks')
+            return None
+        if element.name == 'SeekHead':
+            element.load(stream, specs, ignore_element_names=['Void', 'CRC-32'])
+            position = stream.tell()
+            for seek in element:
+                if seek.name == 'Seek' and 'SeekID' in seek and 'SeekPosition' in seek and \
+                        ebml.read_element_id(seek['SeekID'].data) == TRACKS_ID:
+                    logger.info('Found Tracks element from SeekHead at position %d', seek['SeekPosition'].data)
+                    stream.seek(segment.position + seek['SeekPosition'].data)
+                    tracks = ebml.parse_element(stream, specs)
+                    if tracks is not None and tracks.name == 'Tracks':
+                        return tracks
+                    logger.warning('SeekHead points to %s instead of Tracks', tracks.name if tracks else None)
+            stream.seek(position)
+            continue
+        if element.type == ebml.MASTER:
+            stream.seek(element.size, 1)
+    return None
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+from .exceptions import MalformedMP4Error
+from .mkv import VIDEO_TRACK, AUDIO_TRACK, SUBTITLE_TRACK, ProbedTrack
+from struct import unpack
+import logging
+
+
+__all__ = ['probe_mp4_tracks']
+logger = logging.getLogger(__name__)
+
+
+# Maximum size of the moov box loaded in memory
+MAX_MOOV_SIZE = 32 * 1024 * 1024
+
+# Handler types to track types mapping
+HANDLER_TYPES = {
+    b'vide': VIDEO_TRACK,
+    b'soun': AUDIO_TRACK,
+    b'text': SUBTITLE_TRACK,
+    b'sbtl': SUBTITLE_TRACK,
+    b'subt': SUBTITLE_TRACK,
+    b'clcp': SUBTITLE_TRACK
+}
+
+# Size of the fields of an audio sample entry before its boxes by QuickTime sound description version
+AUDIO_SAMPLE_ENTRY_SIZES = {0: 28, 1: 44, 2: 64}
+
+
+def read_box_header(stream):
+    """Read the header of a box from the `stream`
+
+    :param stream: file-like object from which to read
+    :return: the type of the box and the size of its data, None if it extends to the end of the stream.
+        None when the end of the `stream` is reached
+    :rtype: tuple or None
+
+    """
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = unpack('>L4s', header)
+    if size == 1:
+        largesize = stream.read(8)
+        if len(largesize) < 8:
+            raise MalformedMP4Error('Truncated %r box header' % box_type)
+        return box_type, unpack('>Q', largesize)[0] - 16
+    if size == 0:
+        return box_type, None
+    if size < 8:
+        raise MalformedMP4Error('Invalid size %d for %r box' % (size, box_type))
+    return box_type, size - 8
+
+
+def iter_boxes(data, start=0, end=None):
+    """Iterate over the boxes held in `data` between `start` and `end`
+
+    :param bytes data: data of the parent box
+    :return: the type, start and end of the data of each box
+    :rtype: iterator of tuples
+
+    """
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        size, box_type = unpack('>L4s', data[position:position + 8])
+        header_size = 8
+        if size == 1:
+            if position + 16 > end:
+                raise MalformedMP4Error('Truncated %r box header' % box_type)
+            size = unpack('>Q', data[position + 8:position + 16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size or position + size > end:
+            raise MalformedMP4Error('Invalid size %d for %r box' % (size, box_type))
+        yield box_type, position + header_size, position + size
+        position += size
+
+
+def find_box(data, path, start=0, end=None):
+    """Find the first box along the `path` of box types
+
+    :return: the start and end of the data of the box or None
+    :rtype: tuple or None
+
+    """
+    for box_type, box_start, box_end in iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return box_start, box_end
+            return find_box(data, path[1:], box_start, box_end)
+    return None
+
+
+def read_descriptor_header(data, position, end):
+    """Read the header of an MPEG-4 descriptor at `position` in `data`
+
+    :return: the tag of the descriptor and the start and end of its data or None
+    :rtype: tuple or None
+
+    """
+    if position + 2 > end:
+        return None
+    tag = ord(data[position:position + 1])
+    size = 0
+    position += 1
+    # the size is coded on up to 4 bytes of 7 bits each
+    for _ in range(4):
+        if position >= end:
+            return None
+        byte = ord(data[position:position + 1])
+        position += 1
+        size = (size << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            break
+    return tag, position, min(position + size, end)
+
+
+def read_object_type(data, start, end):
+    """Read the object type indication of the decoder config of an esds box in `data`
+
+    :return: the object type indication or None
+    :rtype: int or None
+
+    """
+    # ES_Descriptor after the version and flags of the box
+    header = read_descriptor_header(data, start + 4, end)
+    if header is None or header[0] != 0x03:
+        return None
+    position, descriptor_end = header[1] + 3, header[2]
+    if position > descriptor_end:
+        return None
+    flags = ord(data[position - 1:position])
+    if flags & 0x80:
+        # dependsOn_ES_ID
+        position += 2
+    if flags & 0x40 and position < descriptor_end:
+        # URL
+        position += 1 + ord(data[position:position + 1])
+    if flags & 0x20:
+        # OCR_ES_Id
+        position += 2
+
+    # DecoderConfigDescriptor
+    header = read_descriptor_header(data, position, descriptor_end)
+    if header is None or header[0] != 0x04 or header[1] >= header[2]:
+        return None
+    return ord(data[header[1]:header[1] + 1])
+
+
+def find_object_type(data, start, end):
+    """Find the object type indication of an mp4a sample entry in `data`
+
+    The esds box follows the fields of the entry, it is held by a wave box in QuickTime files
+
+    :return: the object type indication or None
+    :rtype: int or None
+
+    """
+    if start + 10 > end:
+        return None
+    size = AUDIO_SAMPLE_ENTRY_SIZES.get(unpack('>H', data[start + 8:start + 10])[0])
+    if size is None or start + size > end:
+        return None
+    for box_type, box_start, box_end in iter_boxes(data, start + size, end):
+        if box_type == b'esds':
+            return read_object_type(data, box_start, box_end)
+        if box_type == b'wave':
+            esds = find_box(data, [b'esds'], box_start, box_end)
+            return read_object_type(data, esds[0], esds[1]) if esds is not None else None
+    return None
+
+
+def parse_trak(data, start, end):
+    """Parse a trak box in `data`
+
+    :return: the track or None if it is not a video, audio or subtitle track
+    :rtype: :class:`~enzyme.mkv.ProbedTrack`
+
+    """
+    hdlr = find_box(data, [b'mdia', b'hdlr'], start, end)
+    if hdlr is None or hdlr[1] - hdlr[0] < 12:
+        return None
+    handler = data[hdlr[0] + 8:hdlr[0] + 12]
+    track_type = HANDLER_TYPES.get(handler)
+    if track_type is None:
+        return None
+
+    # track number and flags
+    number = 0
+    enabled = True
+    tkhd = find_box(data, [b'tkhd'], start, end)
+    if tkhd is not None:
+        if tkhd[1] - tkhd[0] >= 4:
+            enabled = bool(unpack('>L', data[tkhd[0]:tkhd[0] + 4])[0] & 1)
+        offset = tkhd[0] + (20 if data[tkhd[0]:tkhd[0] + 1] == b'\x01' else 12)
+        if offset + 4 <= tkhd[1]:
+            number = unpack('>L', data[offset:offset + 4])[0]
+    if handler == b'text' and not enabled:
+        # disabled QuickTime text tracks hold chapters
+        return None
+
+    # language, packed ISO 639-2/T code
+    language = None
+    mdhd = find_box(data, [b'mdia', b'mdhd'], start, end)
+    if mdhd is not None:
+        offset = mdhd[0] + (32 if data[mdhd[0]:mdhd[0] + 1] == b'\x01' else 20)
+        if offset + 2 <= mdhd[1]:
+            packed = unpack('>H', data[offset:offset + 2])[0]
+            if packed:
+                language = bytearray(((packed >> shift) & 0x1f) + 0x60 for shift in (10, 5, 0)).decode('latin-1')
+
+    # codec and resolution from the first sample entry
+    codec_id = width = height = interlaced = None
+    stsd = find_box(data, [b'mdia', b'minf', b'stbl', b'stsd'], start, end)
+    if stsd is not None:
+        for entry_type, entry_start, entry_end in iter_boxes(data, stsd[0] + 8, stsd[1]):
+            codec_id = entry_type.decode('latin-1')
+            if track_type == AUDIO_TRACK and entry_type == b'mp4a':
+                # MPEG-4 audio can be AAC, MP3 and more, told apart by its object type
+                object_type = find_object_type(data, entry_start, entry_end)
+                codec_id = 'mp4a.%02x' % object_type if object_type is not None else None
+            if track_type == VIDEO_TRACK and entry_start + 28 <= entry_end:
+                width, height = unpack('>HH', data[entry_start + 24:entry_start + 28])
+                interlaced = False
+            break
+    return ProbedTrack(track_type, number, None, language, codec_id, width, height, interlaced)
+
+
+def find_chapter_tracks(data, start, end):
+    """Find the numbers of the chapter tracks a trak box in `data` references
+
+    :rtype: set of int
+
+    """
+    numbers = set()
+    tref = find_box(data, [b'tref'], start, end)
+    if tref is not None:
+        for box_type, box_start, box_end in iter_boxes(data, tref[0], tref[1]):
+            if box_type == b'chap':
+                numbers.update(unpack('>%dL' % ((box_end - box_start) // 4),
+                                      data[box_start:box_start + (box_end - box_start) // 4 * 4]))
+    return numbers
+
+
+def probe_mp4_tracks(stream, max_moov_size=MAX_MOOV_SIZE):
+    """Read the tracks of an ISO base media file (MP4, M4V, MOV)
+
+    Only the box headers of the top-level boxes are read until the moov box that is then
+    loaded in memory in a single read
+
+    :param stream: seekable file-like object
+    :param int max_moov_size: maximum size of the moov box
+    :raise MalformedMP4Error: when no moov box can be found or parsed
+    :return: the video, audio and subtitle tracks, with the codec as their `codec_id` (the type of
+        the sample entry, with the object type in hexadecimal for MPEG-4 audio: ``mp4a.40`` for AAC)
+    :rtype: list of :class:`~enzyme.mkv.ProbedTrack`
+
+    """
+    while True:
+        header = read_box_header(stream)
+        if header is None:
+            raise MalformedMP4Error('No moov box found')
+        box_type, size = header
+        if box_type == b'moov':
+            break
+        if size is None:
+            raise MalformedMP4Error('No moov box found before %r box' % box_type)
+        logger.debug('Skipping %r box with size %d', box_type, size)
+        stream.seek(size, 1)
+    if size is None or size > max_moov_size:
+        raise MalformedMP4Error('moov box is too large (%r)' % size)
+    data = stream.read(size)
+    if len(data) < size:
+        raise MalformedMP4Error('Truncated moov box')
+
+    traks = [(start, end) for box_type, start, end in iter_boxes(data) if box_type == b'trak']
+    chapter_tracks = set()
+    for start, end in traks:
+        chapter_tracks |= find_chapter_tracks(data, start, end)
+
+    tracks = []
+    for start, end in traks:
+        track = parse_trak(data, start, end)
+        if track is None:
+            logger.debug('Skipping track that is not a video, audio or subtitle track')
+            continue
+        if track.type == SUBTITLE_TRACK and track.number in chapter_tracks:
+            logger.debug('Skipping chapter track %d', track.number)
+            continue
+        tracks.append(track)
+    return tracks
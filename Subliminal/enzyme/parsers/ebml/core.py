@@ -8,9 +8,12 @@ import logging
 
 __all__ = ['INTEGER', 'UINTEGER', 'FLOAT', 'STRING', 'UNICODE', 'DATE', 'MASTER', 'BINARY',
            'SPEC_TYPES', 'READERS', 'Element', 'MasterElement', 'parse', 'parse_element',
-           'get_matroska_specs']
+           'get_matroska_specs', 'load_matroska_specs']
 logger = logging.getLogger(__name__)
 
+#: Parsed Matroska specs by value of `webm_only`, see :func:`get_matroska_specs`
+_matroska_specs = {}
+
 
 # EBML types
 INTEGER, UINTEGER, FLOAT, STRING, UNICODE, DATE, MASTER, BINARY = range(8)
@@ -225,6 +228,22 @@ def parse_element(stream, specs, load_children=False, ignore_element_types=None,
 def get_matroska_specs(webm_only=False):
     """Get the Matroska specs
 
+    The specs are parsed from :file:`specs/matroska.xml` on the first call only, later
+    calls return a copy of the parsed table
+
+    :param bool webm_only: load *only* WebM specs
+    :return: the specs in the appropriate format. See :ref:`specs`
+    :rtype: dict
+
+    """
+    if webm_only not in _matroska_specs:
+        _matroska_specs[webm_only] = load_matroska_specs(webm_only)
+    return dict(_matroska_specs[webm_only])
+
+
+def load_matroska_specs(webm_only=False):
+    """Parse the Matroska specs from :file:`specs/matroska.xml`
+
     :param bool webm_only: load *only* WebM specs
     :return: the specs in the appropriate format. See :ref:`specs`
     :rtype: dict
@@ -6,11 +6,90 @@ from io import BytesIO
 from struct import unpack
 
 
-__all__ = ['read_element_id', 'read_element_size', 'read_element_integer', 'read_element_uinteger',
+__all__ = ['WindowedStream', 'read_element_id', 'read_element_size', 'read_element_integer', 'read_element_uinteger',
            'read_element_float', 'read_element_string', 'read_element_unicode', 'read_element_date',
            'read_element_binary']
 
 
+class WindowedStream(object):
+    """Read-only file-like object that reads the underlying `stream` by windows of bytes
+
+    Parsing EBML issues a read for every element id, size and data and seeks around for the
+    elements referenced in the SeekHead. On network filesystems every one of those is a round
+    trip so this loads a large window at the start of the `stream` and a window at every
+    position read outside of what is already loaded, and serves all other reads from memory.
+
+    Reads larger than a window are passed through to the `stream`.
+
+    :param stream: seekable file-like object from which to read
+    :param int header_size: size of the window at the start of the `stream`
+    :param int window_size: size of the other windows
+
+    """
+    def __init__(self, stream, header_size=1024 * 1024, window_size=64 * 1024):
+        self.stream = stream
+        self.header_size = header_size
+        self.window_size = window_size
+        #: Loaded windows as (start, data) tuples
+        self.windows = []
+        #: Number of reads issued on the `stream`
+        self.reads = 0
+        #: Size of the `stream`, known once a window reached its end
+        self.end = None
+        self.position = stream.tell()
+
+    def _load(self, position, size):
+        self.stream.seek(position)
+        self.reads += 1
+        data = self.stream.read(size)
+        if size < 0 or len(data) < size:
+            self.end = position + len(data)
+        return data
+
+    def _window(self, position, size):
+        """Find the loaded window that holds `size` bytes at `position`
+
+        :return: the window as a (start, data) tuple or None
+
+        """
+        for start, data in self.windows:
+            stop = start + len(data)
+            if start <= position and (position + size <= stop or stop == self.end and position <= stop):
+                return start, data
+        return None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._load(self.position, -1)
+        else:
+            window = self._window(self.position, size)
+            if window is None and size > self.window_size:
+                data = self._load(self.position, size)
+            else:
+                if window is None:
+                    window = (self.position, self._load(self.position, self.header_size if self.position == 0
+                                                        else self.window_size))
+                    self.windows.append(window)
+                start, window_data = window
+                data = window_data[self.position - start:self.position - start + size]
+        self.position += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.position = offset
+        elif whence == 1:
+            self.position += offset
+        elif whence == 2:
+            self.stream.seek(offset, 2)
+            self.position = self.stream.tell()
+        else:
+            raise ValueError('Invalid whence (%r)' % whence)
+
+    def tell(self):
+        return self.position
+
+
 def _read(stream, size):
     """Read the `stream` for *exactly* `size` bytes and raise an exception if
     less than `size` bytes are actually read
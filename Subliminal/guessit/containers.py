@@ -25,6 +25,10 @@ from .patterns import compile_pattern, sep
 from . import base_text_type
 from .guess import Guess
 import types
+import re
+
+# Named capturing groups of a pattern, resolved without compiling it
+_NAMED_GROUP_RE = re.compile(r'(?<!\\)\(\?P<([^>]+)>')
 
 
 def _get_span(prop, match):
@@ -320,9 +324,11 @@ class _Property:
             self.pattern = canonical_form
         if self.canonical_form is None and canonical_from_pattern:
             self.canonical_form = self.pattern
-        self.compiled = compile_pattern(self.pattern, enhance=enhance)
-        for group_name in _get_groups(self.compiled):
-            if isinstance(group_name, base_text_type) and not group_name in self.keys:
+        # The pattern is only compiled the first time it is matched against
+        self.enhance = enhance
+        self._compiled = None
+        for group_name in _NAMED_GROUP_RE.findall(self.pattern):
+            if not group_name in self.keys:
                 self.keys.append(group_name)
         if not self.keys:
             raise ValueError("No property key is defined")
@@ -333,6 +339,13 @@ class _Property:
         self.formatter = formatter
         self.disabler = disabler
 
+    @property
+    def compiled(self):
+        """Compiled (and enhanced) pattern, built on first access"""
+        if self._compiled is None:
+            self._compiled = compile_pattern(self.pattern, enhance=self.enhance)
+        return self._compiled
+
     def disabled(self, options):
         if self.disabler:
             return self.disabler(options)
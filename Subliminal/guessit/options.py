@@ -65,5 +65,13 @@ def reload(transformers=None):
     _opts, _naming_opts, _output_opts, _information_opts, _webservice_opts, _other_opts = build_opts(transformers)
 
 
+def reset():
+    global _opts, _naming_opts, _output_opts, _information_opts, _webservice_opts, _other_opts
+    _opts, _naming_opts, _output_opts, _information_opts, _webservice_opts, _other_opts = None, None, None, None, None, None
+
+
 def get_opts():
+    if _opts is None:
+        from guessit.plugins.transformers import all_transformers
+        reload(all_transformers())
     return _opts
@@ -19,7 +19,7 @@
 #
 
 from __future__ import absolute_import, division, print_function, unicode_literals
-from guessit.options import reload as reload_options
+from guessit.options import reset as reset_options
 
 from stevedore import ExtensionManager
 from pkg_resources import EntryPoint
@@ -214,6 +214,8 @@ def reload(custom=False):
         _extensions = CustomTransformerExtensionManager()
     else:
         _extensions = DefaultTransformerExtensionManager()
-    reload_options(all_transformers())
+
+    # command line options are rebuilt from the new transformers on demand
+    reset_options()
 
 reload()
@@ -109,37 +109,104 @@ def str_fill(string, region, c):
     return string[:start] + c * (end - start) + string[end:]
 
 
-def levenshtein(a, b):
-    if not a:
-        return len(b)
-    if not b:
-        return len(a)
+def levenshtein(a, b, max_distance=None):
+    """Return the edit distance between `a` and `b`
+
+    Only two rows of the matrix are kept. When `max_distance` is given, only
+    the diagonal band of that width is computed and the computation stops as
+    soon as the distance is known to exceed it, in which case
+    `max_distance + 1` is returned.
+
+    >>> levenshtein('kitten', 'sitting')
+    3
+    >>> levenshtein('kitten', 'sitting', max_distance=1)
+    2
+    >>> levenshtein('', 'abc'), levenshtein('abc', 'abc', 0)
+    (3, 0)
+    """
+    if a == b:
+        return 0
+
+    m = len(a) if a else 0
+    n = len(b) if b else 0
+    if m > n:
+        # iterate over the shortest string
+        a, b, m, n = b, a, n, m
 
-    m = len(a)
-    n = len(b)
-    d = []
-    for i in range(m + 1):
-        d.append([0] * (n + 1))
+    if max_distance is None or max_distance > n:
+        band = n
+    else:
+        band = max_distance
+    too_far = band + 1
 
-    for i in range(m + 1):
-        d[i][0] = i
+    if n - m > band:
+        return too_far
+    if not m:
+        return n
 
-    for j in range(n + 1):
-        d[0][j] = j
+    previous = [j if j <= band else too_far for j in range(n + 1)]
+    current = [too_far] * (n + 1)
 
     for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if a[i - 1] == b[j - 1]:
-                cost = 0
-            else:
-                cost = 1
+        char = a[i - 1]
+        start = max(1, i - band)
+        end = min(n, i + band)
+
+        current[start - 1] = i if start == 1 else too_far
+        row_min = current[start - 1]
+        for j in range(start, end + 1):
+            cost = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+
+        if end < n:
+            # out of band for the next row
+            current[end + 1] = too_far
+
+        if row_min > band:
+            return too_far
+
+        previous, current = current, previous
+
+    return previous[n] if previous[n] <= band else too_far
+
+
+def best_match(string, candidates, max_distance=None):
+    """Return the `(candidate, distance)` pair closest to `string`
+
+    Candidates are tried from the closest length onwards; the best distance
+    found so far becomes the band of the next comparisons, so candidates whose
+    length alone rules them out are never compared. Ties go to the candidate
+    closest in length, then to the first one given. `None` is returned if no
+    candidate is within `max_distance`.
+
+    >>> s(best_match('dexter', ['the wire', 'dexterr', 'dexter new blood']))
+    ('dexterr', 1)
+    >>> best_match('dexter', ['the wire'], max_distance=2) is None
+    True
+    """
+    length = len(string)
+    best = None
+    bound = max_distance
+    for candidate in sorted(candidates, key=lambda c: abs(len(c) - length)):
+        if bound is not None and abs(len(candidate) - length) > bound:
+            # all the remaining candidates are even further away
+            break
 
-            d[i][j] = min(d[i - 1][j] + 1,  # deletion
-                          d[i][j - 1] + 1,  # insertion
-                          d[i - 1][j - 1] + cost  # substitution
-                          )
+        distance = levenshtein(string, candidate, bound)
+        if bound is None or distance <= bound:
+            best = (candidate, distance)
+            if not distance:
+                break
+            # only a strictly better candidate is of interest now
+            bound = distance - 1
 
-    return d[m][n]
+    return best
 
 
 # group-related functions
@@ -356,10 +423,11 @@ def from_camel(string):
 
 
 def common_words(s1, s2):
-    common = []
+    """Return the words of `s2` that are also words of `s1`
+
+    >>> s(common_words('the big bang theory', 'big brother'))
+    ['big']
+    """
     words1 = set(s1.split())
-    for word in s2.split():
-        # strip some chars here, e.g. as in [1]
-        if word in words1:
-            common.append(word)
-    return common
+    # strip some chars here, e.g. as in [1]
+    return [word for word in s2.split() if word in words1]
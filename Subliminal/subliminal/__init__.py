@@ -6,11 +6,13 @@ __license__ = 'MIT'
 __copyright__ = 'Copyright 2013 Antoine Bertin'
 
 import logging
-from .api import PROVIDERS_ENTRY_POINT, list_subtitles, download_subtitles, download_best_subtitles
+from .api import (PROVIDERS_ENTRY_POINT, get_provider_hashes, list_subtitles, download_subtitles,
+                  download_best_subtitles)
 from .cache import MutexLock, region as cache_region
 from .exceptions import Error, ProviderError, ProviderConfigurationError, ProviderNotAvailable, InvalidSubtitle
-from .subtitle import Subtitle
-from .video import VIDEO_EXTENSIONS, SUBTITLE_EXTENSIONS, Video, Episode, Movie, scan_videos, scan_video
+from .subtitle import Subtitle, VideoMatchContext
+from .video import (VIDEO_EXTENSIONS, SUBTITLE_EXTENSIONS, HASH_FUNCTIONS, Video, Episode, Movie, VideoHashes,
+                    scan_videos, scan_video, SubtitleDirectory, get_subtitle_directory, clear_subtitle_directories)
 
 class NullHandler(logging.Handler):
     def emit(self, record):
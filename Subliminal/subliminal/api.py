@@ -8,7 +8,7 @@ import babelfish
 import pkg_resources
 from os.path import basename
 from .exceptions import ProviderNotAvailable, InvalidSubtitle
-from .subtitle import get_subtitle_path
+from .subtitle import VideoMatchContext, get_subtitle_path
 from socket import error as socket_error
 
 logger = logging.getLogger(__name__)
@@ -17,6 +17,23 @@ logger = logging.getLogger(__name__)
 PROVIDERS_ENTRY_POINT = 'subliminal.providers'
 
 
+def get_provider_hashes(providers=None):
+    """Get the names of the hashes used by the `providers`
+
+    :param providers: providers to get the hashes of, if not all
+    :type providers: list of string or None
+    :return: names of the hashes, see :data:`~subliminal.video.HASH_FUNCTIONS`
+    :rtype: set of string
+
+    """
+    hashes = set()
+    for provider_entry_point in pkg_resources.iter_entry_points(PROVIDERS_ENTRY_POINT):
+        if providers is not None and provider_entry_point.name not in providers:
+            continue
+        hashes |= provider_entry_point.load().hashes
+    return hashes
+
+
 def list_subtitles(videos, languages, providers=None, provider_configs=None):
     """List subtitles for `videos` with the given `languages` using the specified `providers`
 
@@ -235,10 +252,34 @@ def download_best_subtitles(videos, languages, providers=None, provider_configs=
             continue
         initialized_providers[provider_entry_point.name] = provider
     try:
+        # list subtitles for all the videos at once with the providers that support it
+        listed_subtitles = {}
+        for provider_name, provider in initialized_providers.items():
+            provider_videos = [(v, provider.languages & languages - v.subtitle_languages) for v in videos
+                               if provider.check(v)]
+            provider_videos = dict([(v, l) for (v, l) in provider_videos if l])
+            if len(provider_videos) < 2 or len(provider_videos) < len([v for v in videos if v in provider_videos]):
+                # nothing to save, or equal videos that cannot be told apart
+                continue
+            try:
+                listed_subtitles[provider_name] = provider.list_videos_subtitles(provider_videos)
+            except NotImplementedError:
+                continue
+            except ProviderNotAvailable as err:
+                logger.warning('Provider %r is not available, discarding it', provider_name)
+                logger.debug('ProviderNotAvailable error: %r', str(err))
+                discarded_providers.add(provider_name)
+                continue
+            except:
+                logger.exception('Unexpected error in provider %r', provider_name)
+                continue
+            logger.info('Listed subtitles with provider %r for %d videos at once', provider_name,
+                        len(provider_videos))
+
+        scored_subtitles = []
         for video in videos:
             # search for subtitles
             subtitles = []
-            downloaded_languages = set()
             for provider_name, provider in initialized_providers.items():
                 if provider.check(video):
                     if provider_name in discarded_providers:
@@ -253,7 +294,10 @@ def download_best_subtitles(videos, languages, providers=None, provider_configs=
                     logger.info('Listing subtitles with provider %r for video %r with languages %r',
                                 provider_name, video, provider_video_languages)
                     try:
-                        provider_subtitles = provider.list_subtitles(video, provider_video_languages)
+                        if provider_name in listed_subtitles:
+                            provider_subtitles = listed_subtitles[provider_name].get(video, [])
+                        else:
+                            provider_subtitles = provider.list_subtitles(video, provider_video_languages)
                     except ProviderNotAvailable as err:
                         logger.warning('Provider %r is not available, discarding it', provider_name)
                         logger.debug('ProviderNotAvailable error: %r', str(err))
@@ -268,9 +312,46 @@ def download_best_subtitles(videos, languages, providers=None, provider_configs=
                     ))
                     subtitles.extend(provider_subtitles)
 
-            # find the best subtitles and download them
-            for subtitle, score in sorted([(s, s.compute_score(video, hi_score_adjust)) \
-                    for s in subtitles], key=operator.itemgetter(1), reverse=True):
+            # score the subtitles, the best first
+            context = VideoMatchContext(video)
+            scored_subtitles.append((video, sorted([(s, s.compute_score(video, hi_score_adjust, context))
+                                                    for s in subtitles], key=operator.itemgetter(1), reverse=True)))
+
+        # download the best subtitles of all the videos at once with the providers that support it
+        best_subtitles = collections.defaultdict(list)
+        for video, video_subtitles in scored_subtitles:
+            best_languages = set()
+            for subtitle, score in video_subtitles:
+                if subtitle.provider_name in discarded_providers or score < min_score or \
+                        subtitle.language in best_languages or \
+                        hearing_impaired is not None and subtitle.hearing_impaired != hearing_impaired:
+                    continue
+                best_subtitles[subtitle.provider_name].append(subtitle)
+                best_languages.add(subtitle.language)
+                if single:
+                    break
+        downloaded_texts = {}
+        for provider_name, provider_subtitles in best_subtitles.items():
+            if len(provider_subtitles) < 2:
+                continue
+            try:
+                downloaded_texts.update(initialized_providers[provider_name].download_subtitles(provider_subtitles))
+            except NotImplementedError:
+                continue
+            except ProviderNotAvailable as err:
+                logger.warning('Provider %r is not available, discarding it', provider_name)
+                logger.debug('ProviderNotAvailable error: %r', str(err))
+                discarded_providers.add(provider_name)
+                continue
+            except:
+                logger.exception('Unexpected error in provider %r', provider_name)
+                continue
+            logger.info('Downloaded %d subtitle(s) with provider %r at once', len(provider_subtitles), provider_name)
+
+        # download the best subtitles of each video
+        for video, video_subtitles in scored_subtitles:
+            downloaded_languages = set()
+            for subtitle, score in video_subtitles:
 
                 # filter
                 if subtitle.provider_name in discarded_providers:
@@ -299,7 +380,12 @@ def download_best_subtitles(videos, languages, providers=None, provider_configs=
 
                 logger.info('Downloading subtitle %r with score %d into %r', subtitle, score, subtitle_path)
                 try:
-                    subtitle_text = provider.download_subtitle(subtitle)
+                    if subtitle in downloaded_texts:
+                        subtitle_text = downloaded_texts[subtitle]
+                        if subtitle_text is None:
+                            raise InvalidSubtitle
+                    else:
+                        subtitle_text = provider.download_subtitle(subtitle)
                     downloaded_subtitles[video].append(subtitle)
                 except ProviderNotAvailable as err:
                     logger.warning('Provider %r is not available, discarding it', subtitle.provider_name)
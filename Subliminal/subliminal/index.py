@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import collections
+import logging
+import re
+from guessit.textutils import best_match, reorder_title
+from .subtitle import sanitize_string
+
+logger = logging.getLogger(__name__)
+
+#: Leading articles ignored by the relaxed keys
+ARTICLES_RE = re.compile('^(the|a|an) ')
+
+#: Punctuation treated as word separators by the relaxed keys
+SEPARATORS_RE = re.compile('[\s.,:;_&+/-]+')
+
+#: Size of the n-grams used to find fuzzy match candidates
+NGRAM_SIZE = 3
+
+#: Maximum number of candidates compared with the edit distance
+MAX_CANDIDATES = 25
+
+
+def show_keys(name):
+    """Build the lookup keys of a show `name`, from the strictest to the most relaxed
+
+    * the sanitized name (see :func:`~subliminal.subtitle.sanitize_string`)
+    * the sanitized name without its year
+    * the year-less name with its article reordered (``Office, The``) and dropped
+    * the tokens of the previous key, sorted
+
+    :param string name: name of the show
+    :return: the keys
+    :rtype: list of string
+
+    """
+    sanitized = sanitize_string(name)
+    no_year = sanitize_string(reorder_title(name), strip_date=True)
+    no_article = ARTICLES_RE.sub('', SEPARATORS_RE.sub(' ', no_year).replace(' and ', ' ').strip())
+    tokens = ' '.join(sorted(no_article.split()))
+    return [sanitized, no_year, no_article, tokens]
+
+
+def ngrams(key):
+    """Return the set of n-grams of a `key`, padded so that short keys still have some"""
+    key = ' %s ' % key
+    return set(key[i:i + NGRAM_SIZE] for i in range(len(key) - NGRAM_SIZE + 1))
+
+
+class ShowIndex(object):
+    """Index of show ids by normalized show names
+
+    Every show is indexed under all the keys returned by :func:`show_keys`; a relaxed key
+    shared by different shows is ambiguous and is not used. What does not resolve through
+    the keys is matched with the edit distance against the candidates sharing the most
+    n-grams with the most relaxed key. The index only holds plain containers so it can be
+    stored in the cache region.
+
+    :param shows: show ids by show names
+    :type shows: dict
+
+    """
+    def __init__(self, shows=None):
+        #: Show id by key, one dict per level of :func:`show_keys`
+        self.levels = [{}, {}, {}, {}]
+        #: Most relaxed keys by n-gram
+        self.grams = collections.defaultdict(set)
+        for name, show_id in (shows or {}).items():
+            self.add(name, show_id)
+
+    def add(self, name, show_id):
+        """Index a show
+
+        :param string name: name of the show
+        :param int show_id: id of the show
+
+        """
+        keys = show_keys(name)
+        for level, key in zip(self.levels, keys):
+            if not key:
+                continue
+            if key in level and level[key] != show_id:
+                # ambiguous key, it no longer identifies a show
+                level[key] = None
+                continue
+            level[key] = show_id
+        for gram in ngrams(keys[-1]):
+            self.grams[gram].add(keys[-1])
+
+    def lookup(self, name, max_distance=None):
+        """Find the show id of `name`
+
+        :param string name: name of the show
+        :param int max_distance: maximum edit distance of a fuzzy match, defaults to about one
+            edit every 8 characters
+        :return: the show id, if any
+        :rtype: int or None
+
+        """
+        keys = show_keys(name)
+        for level, key in zip(self.levels, keys):
+            if level.get(key) is not None:
+                return level[key]
+
+        key = keys[-1]
+        if not key:
+            return None
+        if max_distance is None:
+            max_distance = len(key) // 8
+        if not max_distance:
+            return None
+
+        shared = collections.defaultdict(int)
+        for gram in ngrams(key):
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] += 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:MAX_CANDIDATES]
+        match = best_match(key, candidates, max_distance)
+        if match is None or self.levels[-1].get(match[0]) is None:
+            return None
+        logger.debug('Fuzzy matched show %r with %r (distance %d)', name, match[0], match[1])
+        return self.levels[-1][match[0]]
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    def __contains__(self, name):
+        return self.lookup(name, max_distance=0) is not None
@@ -1,17 +1,68 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import babelfish
+from dogpile.cache.api import NO_VALUE  # @UnresolvedImport
+from ..cache import CACHE_VERSION, region
+from ..exceptions import ProviderNotAvailable
 from ..video import Episode, Movie
 from .. import __version__
 from random import randint
+from time import time
 from os.path import exists
 from os.path import join
 from hashlib import md5
+from threading import Lock
+from urlparse import urlsplit
+import bs4
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+try:
+    from requests.packages.urllib3.util.retry import Retry
+except ImportError:
+    # requests too old for retry policies, the number of retries is used as is
+    Retry = None
 
 logger = logging.getLogger(__name__)
 
+#: Time after which a page cached by :meth:`Provider.get_cached_page` is revalidated, in seconds
+PAGE_REVALIDATION_TIME = 24 * 60 * 60
+
+#: Tree builder used by :func:`parse_html` when only parts of a page are parsed, html5lib
+#: does not support :class:`bs4.SoupStrainer` and always builds the whole tree
+STRAINED_PARSER = 'lxml' if bs4.builder.builder_registry.lookup('lxml') else 'html.parser'
+
+
+def parse_html(content, parse_only=None):
+    """Parse the HTML `content` of a page
+
+    :param bytes content: content of the page
+    :param parse_only: the elements to build, with their descendants, the rest of the page
+        is skipped over; the whole page is built if not given
+    :type parse_only: :class:`bs4.SoupStrainer`
+    :rtype: :class:`bs4.BeautifulSoup`
+
+    """
+    if parse_only is None:
+        return bs4.BeautifulSoup(content, ['permissive'])
+    return bs4.BeautifulSoup(content, STRAINED_PARSER, parse_only=parse_only)
+
+
+def has_class(*names):
+    """Match the class attribute of an element against any of the class `names` in a
+    :class:`bs4.SoupStrainer`, where it is not yet split in a list of classes
+
+    """
+    names = set(names)
+
+    def match(value):
+        if not value:
+            return False
+        if isinstance(value, basestring):
+            value = value.split()
+        return not names.isdisjoint(value)
+    return match
+
 # Agent List
 AGENT_LIST = (
     'Mozilla/5.0 (Windows NT 6.3; rv:36.0) Gecko/20100101 Firefox/36.0',
@@ -30,6 +81,114 @@ AGENT_LIST = (
     'Mozilla/5.0 (X11; Linux x86_64; rv:31.0) Gecko/20100101 Firefox/31.0',
 )
 
+class SessionRegistry(object):
+    """Process-wide :class:`requests.Session` per host
+
+    The sessions, and the connections pooled by their adapters, outlive the providers that use
+    them so that a connection can be kept alive from one video to the next. Providers must not
+    close the sessions they get.
+
+    :param int pool_connections: number of connection pools cached by each adapter
+    :param int pool_maxsize: maximum number of connections kept alive per pool
+    :param int max_retries: number of retries of the connection and read errors of idempotent requests
+    :param float backoff_factor: backoff factor of the retries
+
+    """
+    def __init__(self, pool_connections=4, pool_maxsize=4, max_retries=2, backoff_factor=0.3):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.sessions = {}
+        self.lock = Lock()
+
+    def configure(self, pool_connections=None, pool_maxsize=None, max_retries=None, backoff_factor=None):
+        """Change the given settings, the existing sessions are closed so that the next ones
+        use them
+
+        """
+        if pool_connections is not None:
+            self.pool_connections = pool_connections
+        if pool_maxsize is not None:
+            self.pool_maxsize = pool_maxsize
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if backoff_factor is not None:
+            self.backoff_factor = backoff_factor
+        self.close()
+
+    def get(self, url, headers=None):
+        """Get the session of the host of `url`
+
+        :param string url: URL of the server, only its scheme and host are used
+        :param dict headers: headers added to the default ones of the session when it is created,
+            an existing session keeps its own
+        :rtype: :class:`requests.Session`
+
+        """
+        scheme, netloc = urlsplit(url)[:2]
+        key = '%s://%s' % (scheme, netloc.lower())
+        with self.lock:
+            if key not in self.sessions:
+                self.sessions[key] = self.create_session(headers)
+            return self.sessions[key]
+
+    def create_session(self, headers=None):
+        """Create a session with adapters using the pool and retry settings
+
+        :param dict headers: headers added to the default ones of the session
+
+        """
+        max_retries = self.max_retries
+        if Retry is not None:
+            max_retries = Retry(total=self.max_retries, connect=self.max_retries, read=self.max_retries,
+                                backoff_factor=self.backoff_factor)
+        session = requests.Session()
+        if headers:
+            session.headers.update(headers)
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, HTTPAdapter(pool_connections=self.pool_connections,
+                                              pool_maxsize=self.pool_maxsize, max_retries=max_retries))
+        return session
+
+    def stats(self):
+        """Connection reuse statistics, a request sent on a connection that was already open
+        reused it
+
+        :return: the number of requests sent and connections opened by host
+        :rtype: dict of string => dict
+
+        """
+        stats = {}
+        with self.lock:
+            sessions = self.sessions.values()
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+                if pools is None:
+                    continue
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is None:
+                        continue
+                    host_stats = stats.setdefault(pool.host, {'requests': 0, 'connections': 0})
+                    host_stats['requests'] += getattr(pool, 'num_requests', 0)
+                    host_stats['connections'] += getattr(pool, 'num_connections', 0)
+        return stats
+
+    def close(self):
+        """Close all the sessions and their connections"""
+        with self.lock:
+            sessions = self.sessions.values()
+            self.sessions = {}
+        for session in sessions:
+            session.close()
+
+
+#: The sessions shared by the providers
+sessions = SessionRegistry()
+
+
 class Provider(object):
     """Base class for providers
 
@@ -48,6 +207,9 @@ class Provider(object):
     #: Required hash, if any
     required_hash = None
 
+    #: Hashes used, if available, see :data:`~subliminal.video.HASH_FUNCTIONS`
+    hashes = set()
+
     # Returns a random agent to use from the list above
     random_user_agent = AGENT_LIST[randint(0, len(AGENT_LIST)-1)]
 
@@ -146,6 +308,23 @@ class Provider(object):
         """
         raise NotImplementedError
 
+    def list_videos_subtitles(self, videos):
+        """List subtitles for several `videos` at once
+
+        Providers able to search for several videos in a single request implement this to save requests over
+        calling :meth:`list_subtitles` for each video
+
+        :param videos: languages to search for by video
+        :type videos: dict of :class:`~subliminal.video.Video` => set of :class:`babelfish.Language`
+        :return: the subtitles by video
+        :rtype: dict of :class:`~subliminal.video.Video` => [:class:`~subliminal.subtitle.Subtitle`]
+        :raise: :class:`~subliminal.exceptions.ProviderNotAvailable` if the provider is unavailable
+        :raise: :class:`~subliminal.exceptions.ProviderError` if something unexpected occured
+        :raise: NotImplementedError if the provider does not support it
+
+        """
+        raise NotImplementedError
+
     def download_subtitle(self, subtitle):
         """Download the `subtitle`
 
@@ -160,6 +339,81 @@ class Provider(object):
         """
         raise NotImplementedError
 
+    def download_subtitles(self, subtitles):
+        """Download several `subtitles` at once
+
+        Providers able to download several subtitles in a single request implement this to save requests over
+        calling :meth:`download_subtitle` for each subtitle
+
+        :param subtitles: subtitles to download
+        :type subtitles: list of :class:`~subliminal.subtitle.Subtitle`
+        :return: the text of each subtitle downloaded, None for the invalid ones; subtitles that could not be
+            downloaded are left out
+        :rtype: dict of :class:`~subliminal.subtitle.Subtitle` => string
+        :raise: :class:`~subliminal.exceptions.ProviderNotAvailable` if the provider is unavailable
+        :raise: :class:`~subliminal.exceptions.ProviderError` if something unexpected occured
+        :raise: NotImplementedError if the provider does not support it
+
+        """
+        raise NotImplementedError
+
+    def get_cached_page(self, url, parse, parse_only=None, revalidation_time=PAGE_REVALIDATION_TIME):
+        """Get the value `parse` builds from the page at `url`, cached in the region
+
+        The value is cached along with the ETag and Last-Modified validators of the page. It is used as is for
+        `revalidation_time` seconds, then the page is requested again with If-None-Match and If-Modified-Since:
+        a 304 Not Modified response only refreshes the cached value, the page is parsed again otherwise. The
+        cached value is used as well when the page cannot be revalidated.
+
+        :param string url: part of the URL to reach with the leading slash
+        :param parse: function building the value to cache from the parsed page
+        :param parse_only: the elements of the page to parse, see :func:`parse_html`
+        :type parse_only: :class:`bs4.SoupStrainer`
+        :param int revalidation_time: time after which the page is revalidated, in seconds
+        :return: the value built by `parse`
+        :raise: :class:`~subliminal.exceptions.ProviderNotAvailable` if the page cannot be downloaded and is not
+            cached
+
+        """
+        key = '%d:page:%s%s' % (CACHE_VERSION, self.server, url)
+        cached = region.get(key)
+        if cached is not NO_VALUE and time() - cached['checked'] < revalidation_time:
+            return cached['value']
+
+        headers = {}
+        if cached is not NO_VALUE:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        try:
+            r = self.session.get(self.server + url, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            if cached is NO_VALUE:
+                raise ProviderNotAvailable('Request failed: %s' % e)
+            logger.warning('Could not revalidate %s, using the cached page', url)
+            return cached['value']
+
+        if r.status_code == 304 and cached is not NO_VALUE:
+            logger.debug('Page %s not modified', url)
+            cached['checked'] = time()
+            region.set(key, cached)
+            return cached['value']
+        if r.status_code != 200:
+            if cached is NO_VALUE:
+                raise ProviderNotAvailable('Request failed with status code %d' % r.status_code)
+            logger.warning('Could not revalidate %s (status code %d), using the cached page', url, r.status_code)
+            return cached['value']
+
+        value = parse(parse_html(r.content, parse_only))
+        region.set(key, {
+            'value': value,
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'checked': time(),
+        })
+        return value
+
     def debug_url(self, url, session=None, params=None, headers=None,
                       timeout=10, get=True):
         """A simple wrapper that should only be used for developers who
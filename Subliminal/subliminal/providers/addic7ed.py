@@ -4,15 +4,20 @@ import logging
 import babelfish
 import bs4
 import requests
-from . import Provider
+from . import Provider, parse_html, has_class, sessions
 from ..cache import region
 from ..exceptions import ProviderConfigurationError, ProviderNotAvailable, InvalidSubtitle
-from ..subtitle import Subtitle, is_valid_subtitle, sanitize_string, extract_title_year, detect
+from ..index import ShowIndex
+from ..subtitle import Subtitle, VideoMatchContext, is_valid_subtitle, sanitize_string, extract_title_year, detect
 from ..video import Episode
 
 
 logger = logging.getLogger(__name__)
 
+#: Expiration time of the cached season pages, in seconds; new subtitles show up on them
+#: as episodes air
+SEASON_EXPIRATION_TIME = 30 * 60
+
 
 class Addic7edSubtitle(Subtitle):
     provider_name = 'addic7ed'
@@ -27,10 +32,12 @@ class Addic7edSubtitle(Subtitle):
         self.download_link = download_link
         self.referer = referer
 
-    def compute_matches(self, video):
+    def compute_matches(self, video, context=None):
+        if context is None:
+            context = VideoMatchContext(video)
         matches = set()
         # series
-        if video.series and self.series == video.series:
+        if context.series and self.series == context.series:
             matches.add('series')
         # season
         if video.season and self.season == video.season:
@@ -39,13 +46,14 @@ class Addic7edSubtitle(Subtitle):
         if video.episode and self.episode == video.episode:
             matches.add('episode')
         # title
-        if video.title and self.title.lower() == video.title.lower():
+        if context.title and self.title.lower() == context.title_lower:
             matches.add('title')
+        version = self.version.lower() if self.version else None
         # release_group
-        if video.release_group and self.version and video.release_group.lower() in self.version.lower():
+        if context.release_group and version and context.release_group_lower in version:
             matches.add('release_group')
         # resolution
-        if video.resolution and self.version and video.resolution in self.version.lower():
+        if context.resolution and version and context.resolution in version:
             matches.add('resolution')
         return matches
 
@@ -66,6 +74,9 @@ class Addic7edProvider(Provider):
     def __init__(self, username=None, password=None):
 
         self.logged_in = None
+
+        #: (show id, season) of the season pages downloaded by this instance
+        self.downloaded_seasons = set()
         if username and password:
             logger.info('Addic7ed using authentication serice.')
             self.username = username
@@ -76,11 +87,10 @@ class Addic7edProvider(Provider):
 
 
     def initialize(self):
-        self.session = requests.Session()
-        self.session.headers = {
+        self.session = sessions.get(self.server, headers={
             'User-Agent': self.random_user_agent,
             'Referer': self.server,
-        }
+        })
         if self.logged_in is False:
             # Attempt to log in
             logger.debug('Preparing to log into Addic7ed...')
@@ -106,34 +116,37 @@ class Addic7edProvider(Provider):
                 logger.warning('Failed to authenticate with Addic7ed!')
 
     def terminate(self):
-        # logout
-        if self.logged_in:
-
-            # Toggle our flag reguardless of our success
-            self.logged_in = False
-            try:
-                r = self.session.get(self.server + '/logout.php', timeout=10)
-                logger.debug('Successfully logged out of Addic7ed.')
-            except requests.Timeout:
-                # No problem... we're done anyway
-                logger.warning('A timeout occured logging out of Addic7ed!')
-                return
-
-            if r.status_code != 200:
-                logger.warning(
-                    'Addic7ed returned the error code %d while logging out' %\
-                    r.status_code,
-                )
-                return
+        try:
+            # logout
+            if self.logged_in:
+
+                # Toggle our flag reguardless of our success
+                self.logged_in = False
+                try:
+                    r = self.session.get(self.server + '/logout.php', timeout=10)
+                    logger.debug('Successfully logged out of Addic7ed.')
+                except requests.Timeout:
+                    # No problem... we're done anyway
+                    logger.warning('A timeout occured logging out of Addic7ed!')
+                    return
+
+                if r.status_code != 200:
+                    logger.warning(
+                        'Addic7ed returned the error code %d while logging out' %\
+                        r.status_code,
+                    )
 
-        # Close our session
-        self.session.close()
+        finally:
+            # Our session is shared with the next instances, it is not closed
+            self.session = None
 
-    def get(self, url, params=None):
+    def get(self, url, params=None, parse_only=None):
         """Make a GET request on `url` with the given parameters
 
         :param string url: part of the URL to reach with the leading slash
         :param params: params of the request
+        :param parse_only: the elements of the page to parse, see :func:`~subliminal.providers.parse_html`
+        :type parse_only: :class:`bs4.SoupStrainer`
         :return: the response
         :rtype: :class:`bs4.BeautifulSoup`
         :raise: :class:`~subliminal.exceptions.ProviderNotAvailable`
@@ -145,17 +158,18 @@ class Addic7edProvider(Provider):
             raise ProviderNotAvailable('Timeout after 10 seconds')
         if r.status_code != 200:
             raise ProviderNotAvailable('Request failed with status code %d' % r.status_code)
-        return bs4.BeautifulSoup(r.content, ['permissive'])
+        return parse_html(r.content, parse_only)
 
-    @region.cache_on_arguments()
-    def get_show_ids(self):
-        """Load the shows page with default series to show ids mapping
+    @staticmethod
+    def parse_show_ids(soup):
+        """Parse the shows page with default series to show ids mapping
 
+        :param soup: the shows page
+        :type soup: :class:`bs4.BeautifulSoup`
         :return: series to show ids
         :rtype: dict
 
         """
-        soup = self.get('/shows.php')
         show_ids = {}
         for html_show in soup.select('td.version > h3 > a[href^="/show/"]'):
             try:
@@ -170,11 +184,24 @@ class Addic7edProvider(Provider):
 
         return show_ids
 
+    def get_show_index(self):
+        """Build the :class:`~subliminal.index.ShowIndex` of the shows page
+
+        The index is cached and revalidated with a conditional request, see
+        :meth:`~subliminal.providers.Provider.get_cached_page`
+
+        :return: the show index
+        :rtype: :class:`~subliminal.index.ShowIndex`
+
+        """
+        return self.get_cached_page('/shows.php', lambda soup: ShowIndex(self.parse_show_ids(soup)),
+                                    parse_only=bs4.SoupStrainer('td', class_=has_class('version')))
+
     @region.cache_on_arguments()
     def find_show_id(self, series):
         """Find a show id from the series
 
-        Use this only if the series is not in the dict returned by :meth:`get_show_ids`
+        Use this only if the series is not in the index returned by :meth:`get_show_index`
 
         :param string series: series of the episode
         :return: the show id, if any
@@ -183,7 +210,8 @@ class Addic7edProvider(Provider):
         """
         params = {'search': series, 'Submit': 'Search'}
         logger.debug('Searching series %r', params)
-        suggested_shows = self.get('/search.php', params).select('span.titulo > a[href^="/show/"]')
+        soup = self.get('/search.php', params, parse_only=bs4.SoupStrainer('span', class_=has_class('titulo')))
+        suggested_shows = soup.select('span.titulo > a[href^="/show/"]')
         if not suggested_shows:
             logger.info('Series %r not found', series)
             return None
@@ -199,12 +227,10 @@ class Addic7edProvider(Provider):
             ))
         return None
 
-    def query(self, series, season):
-        show_ids = self.get_show_ids()
-        sanitized_series = sanitize_string(series)
-        if sanitized_series in show_ids:
-            show_id = show_ids[sanitized_series]
-        else:
+    def query(self, series, season, episode=None):
+        show_id = self.get_show_index().lookup(series)
+        if show_id is None:
+            sanitized_series = sanitize_string(series)
             show_id = self.find_show_id(sanitized_series)
             if show_id is None:
                 if extract_title_year(sanitized_series):
@@ -217,11 +243,36 @@ class Addic7edProvider(Provider):
                     show_id = self.find_show_id(sanitized_series)
                     if show_id is None:
                         return []
+        link = '/show/{show_id}&season={season}'.format(show_id=show_id, season=season)
+        rows = self.get_season_rows(show_id, season)
+        if episode is not None and not any(row[0] == episode for row in rows) and \
+                (show_id, season) not in self.downloaded_seasons:
+            logger.debug('Episode %d missing from the cached season page, downloading it again', episode)
+            self.get_season_rows.invalidate(self, show_id, season)
+            rows = self.get_season_rows(show_id, season)
+        return [Addic7edSubtitle(babelfish.Language.fromaddic7ed(language), series, season, row_episode, title,
+                                 version, hearing_impaired, download_link, link)
+                for row_episode, title, language, version, hearing_impaired, download_link in rows]
+
+    @region.cache_on_arguments(expiration_time=SEASON_EXPIRATION_TIME)
+    def get_season_rows(self, show_id, season):
+        """Download and parse the season page of a show
+
+        Only the rows are cached so that all the episodes of the season share a single download
+
+        :param int show_id: show id
+        :param int season: season of the episodes
+        :return: the completed subtitles of the season as (episode, title, language, version,
+            hearing_impaired, download_link) tuples
+        :rtype: list of tuple
+
+        """
         params = {'show_id': show_id, 'season': season}
         logger.debug('Searching subtitles %r', params)
         link = '/show/{show_id}&season={season}'.format(**params)
-        soup = self.get(link)
-        subtitles = []
+        soup = self.get(link, parse_only=bs4.SoupStrainer('tr', class_=has_class('epeven')))
+        self.downloaded_seasons.add((show_id, season))
+        rows = []
         for row in soup('tr', class_='epeven completed'):
             cells = row('td')
             if cells[5].string != 'Completed':
@@ -230,13 +281,14 @@ class Addic7edProvider(Provider):
             if not cells[3].string:
                 logger.debug('Skipping empty language')
                 continue
-            subtitles.append(Addic7edSubtitle(babelfish.Language.fromaddic7ed(cells[3].string), series, season,
-                                              int(cells[1].string), cells[2].string, cells[4].string,
-                                              bool(cells[6].string), cells[9].a['href'], link))
-        return subtitles
+            # plain strings, the NavigableStrings would drag the whole page into the cache
+            title, language, version = [unicode(c.string) if c.string is not None else None for c in cells[2:5]]
+            rows.append((int(cells[1].string), title, language, version, bool(cells[6].string),
+                         unicode(cells[9].a['href'])))
+        return rows
 
     def list_subtitles(self, video, languages):
-        return [s for s in self.query(video.series, video.season)
+        return [s for s in self.query(video.series, video.season, video.episode)
                 if s.language in languages and s.episode == video.episode]
 
     def download_subtitle(self, subtitle):
@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 import base64
+import errno
+import httplib
+import json
 import logging
 import os
 import re
+import socket
+import tempfile
 import xmlrpclib
 import zlib
 import babelfish
@@ -11,13 +16,85 @@ import guessit
 from . import Provider
 from .. import __version__
 from ..exceptions import ProviderError, ProviderNotAvailable, InvalidSubtitle
-from ..subtitle import Subtitle, is_valid_subtitle, compute_guess_matches
+from ..subtitle import Subtitle, VideoMatchContext, is_valid_subtitle, compute_guess_matches
 from ..subtitle import sanitize_string, detect
 from ..video import Episode, Movie
 
 
 logger = logging.getLogger(__name__)
 
+#: XML-RPC methods that are safe to send again when a kept-alive connection was dropped
+IDEMPOTENT_METHODS = frozenset(['SearchSubtitles', 'DownloadSubtitles', 'NoOperation', 'ServerInfo',
+                                'GetSubLanguages', 'CheckMovieHash', 'CheckSubHash'])
+
+#: Socket errors of a kept-alive connection closed by the server
+DROPPED_CONNECTION_ERRNOS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+
+METHOD_NAME_RE = re.compile(br'<methodName>([^<]+)</methodName>')
+
+
+class OpenSubtitlesTransport(xmlrpclib.Transport):
+    """XML-RPC transport over a persistent HTTP/1.1 connection with timeouts and gzip responses
+
+    The gzipped responses are decompressed as they are read and fed to the parser, a call of
+    :data:`IDEMPOTENT_METHODS` is sent again once if the server dropped the kept-alive connection
+
+    :param int connect_timeout: timeout to establish the connection, in seconds
+    :param int read_timeout: timeout of each read on the connection, in seconds
+
+    """
+    accept_gzip_encoding = True
+
+    def __init__(self, connect_timeout=10, read_timeout=30):
+        xmlrpclib.Transport.__init__(self)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def request(self, host, handler, request_body, verbose=0):
+        reused = self._connection[1] is not None and self._connection[1].sock is not None
+        try:
+            return self.single_request(host, handler, request_body, verbose)
+        except (socket.error, httplib.BadStatusLine, httplib.ResponseNotReady) as e:
+            if isinstance(e, socket.timeout) or not reused:
+                raise
+            if isinstance(e, socket.error) and e.errno not in DROPPED_CONNECTION_ERRNOS:
+                raise
+            match = METHOD_NAME_RE.search(request_body)
+            if not match or match.group(1) not in IDEMPOTENT_METHODS:
+                raise
+            logger.debug('Kept-alive connection dropped, sending %s again', match.group(1))
+            self.close()
+            return self.single_request(host, handler, request_body, verbose)
+
+    def make_connection(self, host):
+        if self._connection[1] is None or host != self._connection[0]:
+            self.close()
+            chost, self._extra_headers, _ = self.get_host_info(host)
+            self._connection = host, httplib.HTTPConnection(chost, timeout=self.connect_timeout)
+        connection = self._connection[1]
+        if connection.sock is None:
+            # connect now rather than on send so that reads get their own timeout
+            connection.connect()
+            connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def parse_response(self, response):
+        decompressor = None
+        if response.getheader('Content-Encoding', '') == 'gzip':
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        parser, unmarshaller = self.getparser()
+        while True:
+            data = response.read(8192)
+            if not data:
+                break
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+            parser.feed(data)
+        if decompressor is not None:
+            parser.feed(decompressor.flush())
+        parser.close()
+        return unmarshaller.close()
+
 
 class OpenSubtitlesSubtitle(Subtitle):
     provider_name = 'opensubtitles'
@@ -45,14 +122,14 @@ class OpenSubtitlesSubtitle(Subtitle):
     def series_title(self):
         return self.series_re.match(self.movie_name).group('series_title')
 
-    def compute_matches(self, video):
+    def compute_matches(self, video, context=None):
+        if context is None:
+            context = VideoMatchContext(video)
         matches = set()
         # episode
         if isinstance(video, Episode) and self.movie_kind == 'episode':
             # series
-            if video.series and \
-                    sanitize_string(self.series_name) == \
-                    sanitize_string(video.series):
+            if context.series and sanitize_string(self.series_name) == context.series_sanitized:
                 matches.add('series')
             # season
             if video.season and self.series_season == video.season:
@@ -61,27 +138,27 @@ class OpenSubtitlesSubtitle(Subtitle):
             if video.episode and self.series_episode == video.episode:
                 matches.add('episode')
             # guess
-            matches |= compute_guess_matches(video, guessit.guess_episode_info(self.movie_release_name + '.mkv'))
+            matches |= compute_guess_matches(video, guessit.guess_episode_info(self.movie_release_name + '.mkv'),
+                                             context)
         # movie
         elif isinstance(video, Movie) and self.movie_kind == 'movie':
             # year
             if video.year and self.movie_year == video.year:
                 matches.add('year')
             # guess
-            matches |= compute_guess_matches(video, guessit.guess_movie_info(self.movie_release_name + '.mkv'))
+            matches |= compute_guess_matches(video, guessit.guess_movie_info(self.movie_release_name + '.mkv'),
+                                             context)
         else:
             logger.info('%r is not a valid movie_kind for %r', self.movie_kind, video)
             return matches
         # hash
-        if 'opensubtitles' in video.hashes and self.hash == video.hashes['opensubtitles']:
+        if 'opensubtitles' in context.hashes and self.hash == context.hashes['opensubtitles']:
             matches.add('hash')
         # imdb_id
-        if video.imdb_id and self.movie_imdb_id == video.imdb_id:
+        if context.imdb_id and self.movie_imdb_id == context.imdb_id:
             matches.add('imdb_id')
         # title
-        if video.title and \
-                sanitize_string(self.movie_name) == \
-                sanitize_string(video.title):
+        if context.title and sanitize_string(self.movie_name) == context.title_sanitized:
             matches.add('title')
         return matches
 
@@ -94,11 +171,25 @@ class OpenSubtitlesProvider(Provider):
     server_url = 'http://api.opensubtitles.org/xml-rpc'
 
     languages = set([babelfish.Language.fromopensubtitles(l) for l in babelfish.language_converters['opensubtitles'].codes])
+    hashes = set(['opensubtitles'])
+
+    #: Maximum number of videos searched for in a single SearchSubtitles request
+    search_batch_size = 20
+
+    #: Maximum number of rows returned by a SearchSubtitles request
+    search_limit = 500
+
+    #: Maximum number of subtitles downloaded in a single DownloadSubtitles request
+    download_batch_size = 20
 
-    def __init__(self, username=None, password=None):
+    def __init__(self, username=None, password=None, token_file=None):
         self.server = None
         self.token = None
 
+        #: Path of the file the token is kept in between sessions, the session is
+        #: then left open on :meth:`terminate`
+        self.token_file = token_file
+
         if username and password:
             logger.info('Open Subtitles using authentication serice.')
             self.username = username
@@ -108,12 +199,15 @@ class OpenSubtitlesProvider(Provider):
             logger.info('Open Subtitles using non-authenticated service.')
 
     def initialize(self):
-        self.server = xmlrpclib.ServerProxy(self.server_url)
+        if self.server is None:
+            self.server = xmlrpclib.ServerProxy(self.server_url, OpenSubtitlesTransport())
+        if self.resume_session():
+            return
         try:
             response = self.server.LogIn(
                 self.username, self.password, 'eng', 'subliminal v%s' % __version__)
 
-        except xmlrpclib.ProtocolError:
+        except (xmlrpclib.ProtocolError, socket.error, httplib.HTTPException):
             raise ProviderNotAvailable
 
         if response['status'].startswith('401'):
@@ -134,29 +228,86 @@ class OpenSubtitlesProvider(Provider):
         if not self.token:
             raise ProviderError('Failed to acquire a token for Open Subtitles!')
 
+        self.save_token()
+
+    def resume_session(self):
+        """Reuse the token saved in :attr:`token_file` if the session is still alive
+
+        The session is checked, and extended, with a NoOperation request
+
+        :return: True if the token was reused
+        :rtype: bool
+
+        """
+        if not self.token_file:
+            return False
+        try:
+            with open(self.token_file, 'r') as f:
+                saved = json.load(f)
+            token = saved['token']
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return False
+        if saved.get('username', '') != self.username:
+            logger.debug('Saved token belongs to another user')
+            return False
+
+        try:
+            response = self.server.NoOperation(token)
+        except (xmlrpclib.ProtocolError, socket.error, httplib.HTTPException):
+            raise ProviderNotAvailable
+        if response['status'] != '200 OK':
+            logger.debug('Saved token expired with status %r', response['status'])
+            return False
+
+        logger.debug('Resuming session with saved token')
+        self.token = token
+        return True
+
+    def save_token(self):
+        """Save the token in :attr:`token_file`, readable by the owner only"""
+        if not self.token_file:
+            return
+        tmp_path = None
+        try:
+            # a temporary file of its own (created with mode 0600) as several
+            # runs can share the token file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.token_file) or '.',
+                                            prefix=os.path.basename(self.token_file) + '.')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'token': self.token, 'username': self.username}, f)
+            if os.name == 'nt' and os.path.exists(self.token_file):
+                # rename() does not replace files on Windows
+                os.remove(self.token_file)
+            os.rename(tmp_path, self.token_file)
+        except (IOError, OSError) as e:
+            logger.warning('Could not save the token in %r: %s', self.token_file, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
     def terminate(self):
 
         if self.server is None:
             # Nothing to do
             return
 
+        if self.token_file:
+            # Keep the session for the next run
+            self.server('close')()
+            return
+
         try:
             response = self.server.LogOut(self.token)
-        except xmlrpclib.ProtocolError:
-            raise ProviderNotAvailable
-        except xmlrpclib.ResponseNotReady:
+        except httplib.ResponseNotReady:
             logger.warning('ResponseNotReady exception thrown on logout.')
             return
+        except (xmlrpclib.ProtocolError, socket.error, httplib.HTTPException):
+            raise ProviderNotAvailable
 
         if response['status'] != '200 OK':
             raise ProviderError('Logout failed with status %r' % response['status'])
 
-    def query(self, languages, hash=None, size=None, imdb_id=None, query=None):  # @ReservedAssignment
-
-        if self.server is None:
-            # Nothing to do
-            return []
-
+    def get_searches(self, languages, hash=None, size=None, imdb_id=None, query=None):  # @ReservedAssignment
+        """Build the SearchSubtitles criteria, see :meth:`query`"""
         searches = []
         if hash and size:
             searches.append({'moviehash': hash, 'moviebytesize': str(size)})
@@ -168,53 +319,175 @@ class OpenSubtitlesProvider(Provider):
             raise ValueError('One or more parameter missing')
         for search in searches:
             search['sublanguageid'] = ','.join(l.opensubtitles for l in languages)
+        return searches
+
+    def search(self, searches):
+        """Send a SearchSubtitles request with the `searches` criteria
+
+        :return: the rows of the response
+        :rtype: list of dict
+
+        """
         logger.debug('Searching subtitles %r', searches)
         try:
             response = self.server.SearchSubtitles(self.token, searches)
-        except xmlrpclib.ProtocolError:
+        except (xmlrpclib.ProtocolError, socket.error, httplib.HTTPException):
             raise ProviderNotAvailable
         if response['status'] != '200 OK':
             raise ProviderError('Search failed with status %r' % response['status'])
         if not response['data']:
             logger.debug('No subtitle found')
             return []
-        return [OpenSubtitlesSubtitle(babelfish.Language.fromopensubtitles(r['SubLanguageID']),
-                                      bool(int(r['SubHearingImpaired'])), r['IDSubtitleFile'], r['MatchedBy'],
-                                      r['MovieKind'], r['MovieHash'], r['MovieName'], r['MovieReleaseName'],
-                                      int(r['MovieYear']) if r['MovieYear'] else None, int(r['IDMovieImdb']),
-                                      int(r['SeriesSeason']) if r['SeriesSeason'] else None,
-                                      int(r['SeriesEpisode']) if r['SeriesEpisode'] else None)
-                for r in response['data']]
+        return response['data']
+
+    @staticmethod
+    def get_subtitle(row):
+        """Build the subtitle of a SearchSubtitles response `row`"""
+        return OpenSubtitlesSubtitle(babelfish.Language.fromopensubtitles(row['SubLanguageID']),
+                                     bool(int(row['SubHearingImpaired'])), row['IDSubtitleFile'], row['MatchedBy'],
+                                     row['MovieKind'], row['MovieHash'], row['MovieName'], row['MovieReleaseName'],
+                                     int(row['MovieYear']) if row['MovieYear'] else None, int(row['IDMovieImdb']),
+                                     int(row['SeriesSeason']) if row['SeriesSeason'] else None,
+                                     int(row['SeriesEpisode']) if row['SeriesEpisode'] else None)
 
-    def list_subtitles(self, video, languages):
-        query = None
+    def query(self, languages, hash=None, size=None, imdb_id=None, query=None):  # @ReservedAssignment
+
+        if self.server is None:
+            # Nothing to do
+            return []
+
+        return [self.get_subtitle(r) for r in self.search(self.get_searches(languages, hash, size, imdb_id, query))]
+
+    def get_video_query(self, video):
+        """The full-text query of a `video` that has neither a hash nor an IMDb id, if any"""
         if ('opensubtitles' not in video.hashes or not video.size) and not video.imdb_id:
-            query = video.name.split(os.sep)[-1]
+            return video.name.split(os.sep)[-1]
+        return None
+
+    def list_subtitles(self, video, languages):
         return self.query(languages, hash=video.hashes.get('opensubtitles'), size=video.size, imdb_id=video.imdb_id,
-                          query=query)
+                          query=self.get_video_query(video))
 
-    def download_subtitle(self, subtitle):
+    def list_videos_subtitles(self, videos):
+        """List subtitles for several `videos` with a SearchSubtitles request per :attr:`search_batch_size` videos
+
+        The rows of a batch are given back to the videos by `MovieHash` or `IDMovieImdb`, depending on what they
+        matched. A batch whose response may have been truncated at :attr:`search_limit` rows is split and searched
+        again. Videos only searchable by full-text query are searched on their own.
 
+        """
+        subtitles = dict((video, []) for video in videos)
+        if self.server is None:
+            # Nothing to do
+            return subtitles
+
+        batch = []
+        for video, languages in videos.items():
+            if self.get_video_query(video) is not None:
+                subtitles[video] = self.list_subtitles(video, languages)
+                continue
+            batch.append((video, languages))
+        for i in range(0, len(batch), self.search_batch_size):
+            self.search_batch(batch[i:i + self.search_batch_size], subtitles)
+        return subtitles
+
+    def search_batch(self, batch, subtitles):
+        """Search for the subtitles of a `batch` of (video, languages) in a single request
+
+        :param list batch: videos and languages to search for
+        :param dict subtitles: subtitles by video, extended with the subtitles found
+
+        """
+        searches = []
+        for video, languages in batch:
+            searches.extend(self.get_searches(languages, hash=video.hashes.get('opensubtitles'), size=video.size,
+                                              imdb_id=video.imdb_id))
+        rows = self.search(searches)
+        if len(rows) >= self.search_limit and len(batch) > 1:
+            logger.debug('Search of %d videos may be truncated, splitting it', len(batch))
+            self.search_batch(batch[:len(batch) // 2], subtitles)
+            self.search_batch(batch[len(batch) // 2:], subtitles)
+            return
+
+        for video, languages in batch:
+            video_hash = video.hashes.get('opensubtitles') if video.size else None
+            for row in rows:
+                if row['MatchedBy'] == 'moviehash':
+                    if not video_hash or row['MovieHash'] != video_hash:
+                        continue
+                elif row['MatchedBy'] == 'imdbid':
+                    if not video.imdb_id or int(row['IDMovieImdb']) != int(video.imdb_id):
+                        continue
+                elif len(batch) > 1:
+                    # cannot tell which video it is for
+                    continue
+                subtitle = self.get_subtitle(row)
+                if subtitle.language in languages:
+                    subtitles[video].append(subtitle)
+
+    def download(self, ids):
+        """Send a DownloadSubtitles request for the subtitle `ids`
+
+        :return: the base64 encoded and gzipped data by subtitle id
+        :rtype: dict
+
+        """
         if self.server is None:
             # Nothing to do
             raise ProviderError('Provider not initialized.')
 
         try:
-            response = self.server.DownloadSubtitles(self.token, [subtitle.id])
+            response = self.server.DownloadSubtitles(self.token, ids)
             logger.debug('Download URL: %s {token=%s, subid:%s}' % (
                 self.server_url,
-                self.token, subtitle.id,
+                self.token, ','.join(ids),
             ))
-        except xmlrpclib.ProtocolError:
+        except (xmlrpclib.ProtocolError, socket.error, httplib.HTTPException):
             raise ProviderNotAvailable
         if response['status'] != '200 OK':
             raise ProviderError(
                 'Download failed with status %s' % str(response['status']))
         if not response['data']:
             raise ProviderError('Nothing to download')
-        subtitle_bytes = zlib.decompress(base64.b64decode(response['data'][0]['data']), 47)
+        return dict((r['idsubtitlefile'], r['data']) for r in response['data'])
+
+    @staticmethod
+    def decode_subtitle(subtitle, data):
+        """Decode the downloaded `data` of the `subtitle`
+
+        :raise: :class:`~subliminal.exceptions.InvalidSubtitle` if the subtitle is invalid
+
+        """
+        subtitle_bytes = zlib.decompress(base64.b64decode(data), 47)
         subtitle_text = subtitle_bytes.decode(
             detect(subtitle_bytes, subtitle.language.alpha2)['encoding'], 'replace')
         if not is_valid_subtitle(subtitle_text):
             raise InvalidSubtitle
         return subtitle_text
+
+    def download_subtitle(self, subtitle):
+        data = self.download([subtitle.id])
+        if subtitle.id not in data:
+            raise ProviderError('Nothing to download')
+        return self.decode_subtitle(subtitle, data[subtitle.id])
+
+    def download_subtitles(self, subtitles):
+        """Download the `subtitles` with a DownloadSubtitles request per :attr:`download_batch_size` subtitles
+
+        Each subtitle is decoded and validated on its own
+
+        """
+        texts = {}
+        for i in range(0, len(subtitles), self.download_batch_size):
+            batch = subtitles[i:i + self.download_batch_size]
+            data = self.download(list(set(s.id for s in batch)))
+            for subtitle in batch:
+                if subtitle.id not in data:
+                    logger.debug('Subtitle %r was not downloaded', subtitle)
+                    continue
+                try:
+                    texts[subtitle] = self.decode_subtitle(subtitle, data[subtitle.id])
+                except (InvalidSubtitle, zlib.error, TypeError):
+                    logger.debug('Subtitle %r is invalid', subtitle)
+                    texts[subtitle] = None
+        return texts
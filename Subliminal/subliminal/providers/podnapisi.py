@@ -4,15 +4,16 @@ import io
 import logging
 import re
 import contextlib
+from multiprocessing.pool import ThreadPool
 import xml.etree.ElementTree
 import zipfile
 import babelfish
 import bs4
 import guessit
 import requests
-from . import Provider
+from . import Provider, parse_html, has_class, sessions
 from ..exceptions import InvalidSubtitle, ProviderNotAvailable, ProviderError
-from ..subtitle import Subtitle, is_valid_subtitle, compute_guess_matches
+from ..subtitle import Subtitle, VideoMatchContext, is_valid_subtitle, compute_guess_matches
 from ..subtitle import sanitize_string, extract_title_year, detect
 from ..video import Episode, Movie
 from urllib import quote
@@ -40,15 +41,32 @@ class PodnapisiSubtitle(Subtitle):
         self.episode = episode
         self.title = title
         self.year = year
+        #: guessit results of the `releases` by video type, they are needed
+        #: again when the subtitle is scored after the search
+        self.release_guesses = {}
 
-    def compute_matches(self, video):
+    def guess_releases(self, video_type):
+        """Guess the details of the `releases` as an episode or a movie
+
+        :param video_type: :class:`~subliminal.video.Episode` or :class:`~subliminal.video.Movie`
+        :return: the guesses, in the order of the `releases`
+        :rtype: list of :class:`guessit.Guess`
+
+        """
+        if video_type not in self.release_guesses:
+            guess = guessit.guess_episode_info if video_type is Episode else guessit.guess_movie_info
+            self.release_guesses[video_type] = [guess(release + '.mkv') for release in self.releases]
+        return self.release_guesses[video_type]
+
+    def compute_matches(self, video, context=None):
+        if context is None:
+            context = VideoMatchContext(video)
         matches = set()
         # episode
         if isinstance(video, Episode):
             # series
-            if video.series and \
-                sanitize_string(self.series, strip_date=True) == \
-                sanitize_string(video.series, strip_date=True):
+            if context.series and \
+                sanitize_string(self.series, strip_date=True) == context.series_sanitized_no_date:
                 matches.add('series')
             # season
             if video.season and self.season == video.season:
@@ -57,22 +75,20 @@ class PodnapisiSubtitle(Subtitle):
             if video.episode and self.episode == video.episode:
                 matches.add('episode')
             # guess
-            for release in self.releases:
-                matches |= compute_guess_matches(video, guessit.guess_episode_info(release + '.mkv'))
+            for guess in self.guess_releases(Episode):
+                matches |= compute_guess_matches(video, guess, context)
 
         # movie
         elif isinstance(video, Movie):
             # title
-            if video.title and \
-                sanitize_string(self.title) == \
-                sanitize_string(video.title):
+            if context.title and sanitize_string(self.title) == context.title_sanitized:
                 matches.add('title')
             # year
             if video.year and self.year == video.year:
                 matches.add('year')
             # guess
-            for release in self.releases:
-                matches |= compute_guess_matches(video, guessit.guess_movie_info(release + '.mkv'))
+            for guess in self.guess_releases(Movie):
+                matches |= compute_guess_matches(video, guess, context)
         return matches
 
 
@@ -89,8 +105,21 @@ class PodnapisiProvider(Provider):
 
     headers = {}
 
+    #: Elements of a search page used: the rows of results and the pagination
+    results_strainer = bs4.SoupStrainer(['tr', 'ul'], class_=has_class('subtitle-entry', 'pagination'))
+
+    #: Maximum number of pages of results fetched per query and language
+    max_pages = 10
+
+    #: Number of pages of results fetched at once
+    page_workers = 3
+
+    #: Number of subtitles matching the release details of the video after
+    #: which no more pages of results are fetched
+    enough_subtitles = 3
+
     def initialize(self):
-        self.session = requests.Session()
+        self.session = sessions.get(self.server)
         self.headers = {
             'Accept': '*/*',
             'User-Agent': self.random_user_agent,
@@ -98,17 +127,20 @@ class PodnapisiProvider(Provider):
         }
 
     def terminate(self):
-        self.session.close()
+        # the session is shared with the next instances, it is not closed
+        self.session = None
 
-    def get(self, url, params=None, headers=None, is_xml=False):
+    def get(self, url, params=None, headers=None, is_xml=False, parse_only=None):
         """Make a GET request on `url` with the given parameters
 
         :param string url: part of the URL to reach with the leading slash
         :param dict params: params of the request
         :param dict headers: headers of the request
         :param bool xml: whether the response content is XML or not
-        :return: the response
-        :rtype: :class:`xml.etree.ElementTree.Element` or :class:`bs4.BeautifulSoup`
+        :param parse_only: the elements of the page to parse, see :func:`~subliminal.providers.parse_html`
+        :type parse_only: :class:`bs4.SoupStrainer`
+        :return: the response and its URL, after redirects
+        :rtype: tuple of (:class:`xml.etree.ElementTree.Element` or :class:`bs4.BeautifulSoup`, string)
         :raise: :class:`~subliminal.exceptions.ProviderNotAvailable`
 
         """
@@ -121,23 +153,21 @@ class PodnapisiProvider(Provider):
         # Update url
         url = '%s%s' % (prefix_url, url)
 
-        # Handle Headers
-        self.session.headers = self.headers
+        # Handle Headers; the session is shared by concurrent requests so
+        # they are given with each request rather than set on the session
+        request_headers = dict(self.headers)
 
         # Apply over-ride
         if headers:
-            self.session.headers.update(headers)
+            request_headers.update(headers)
 
-        self.last_url = None
         try:
             r = self.session.get(
                 url,
                 params=params,
-                headers=headers,
+                headers=request_headers,
                 timeout=10,
             )
-            # store last url
-            self.last_url = r.url
 
         except requests.Timeout:
             raise ProviderNotAvailable('Timeout after 10 seconds')
@@ -145,18 +175,26 @@ class PodnapisiProvider(Provider):
             raise ProviderNotAvailable('Request failed with status code %d' % r.status_code)
 
         if is_xml:
-            return xml.etree.ElementTree.fromstring(r.content)
+            return xml.etree.ElementTree.fromstring(r.content), r.url
         else:
-            return bs4.BeautifulSoup(r.content, ['permissive'])
+            return parse_html(r.content, parse_only), r.url
 
-    def query(self, language, series=None, season=None, episode=None, title=None, year=None):
+    def query(self, languages, series=None, season=None, episode=None, title=None, year=None, video=None):
         """
         Preforms a query for a show on Podnapisi.net
+
+        All the `languages` are searched for at once, the results are told
+        apart by the language code their link starts with.
+
+        The remaining pages of results are fetched :attr:`page_workers` at a
+        time and paging stops once :attr:`enough_subtitles` subtitles that
+        match the `video`, if given, well enough are found in every language
         """
-        # Track page count (for multipage fetches
-        page = 1
         # parameter listing
-        params = {'language': language.alpha2, 'page': str(page)}
+        params = {
+            'language': sorted(set(l.alpha2 for l in languages)),
+            'page': '1',
+        }
         if series and season and episode:
             params['keywords'] = sanitize_string(series, strip_date=True)
             params['seasons'] = season
@@ -172,163 +210,256 @@ class PodnapisiProvider(Provider):
         else:
             raise ValueError('Missing parameters series and season and episode or title')
         logger.debug('Searching series %r', params)
-        subtitles = []
 
         # Initial Fetch
-        preload = self.get(
+        soup, preload_url = self.get(
             '/subtitles/search/advanced',
             params=params,
-        )
-        preload_url = self.last_url
-
-        # Fetch tracking details
-        verify = self.get(
-            '/forum/app.php/track',
-            params=dict([('path', quote('/subtitles/search/advanced', ''))] + \
-                         params.items()),
-            headers={
-                'Referer': preload_url,
-            },
+            parse_only=self.results_strainer,
         )
 
-        # Reload page
-        soup = self.get(
-            '/subtitles/search/advanced',
-            params=params,
-            headers = {
-                'Referer': preload_url,
-            },
-        )
+        if not soup('tr', class_='subtitle-entry'):
+            # No results yet; the site may only serve them once the search
+            # was tracked
+
+            # Fetch tracking details
+            self.get(
+                '/forum/app.php/track',
+                params=dict([('path', quote('/subtitles/search/advanced', ''))] + \
+                             params.items()),
+                headers={
+                    'Referer': preload_url,
+                },
+            )
 
-        # Get page information
-        pages = soup.find('div', class_='panel-body')
-        pages = pages.find('ul', class_='pagination')
-        if pages:
-            bullets = pages('li')
-            pages = int(bullets[-2][0].a.string)
-        else:
-            pages = 1
+            # Reload page
+            soup, _ = self.get(
+                '/subtitles/search/advanced',
+                params=params,
+                headers = {
+                    'Referer': preload_url,
+                },
+                parse_only=self.results_strainer,
+            )
 
+        # Get page information
+        pages = self.get_page_count(soup)
         logger.debug('Podnapisi page matches: %r' % pages)
-        while page < 10:
-            # Set a hard cap on page count to 10, there is really
-            # no reason to turn up more content then that
-            for row in soup('tr', class_='subtitle-entry'):
-                cells = row('td')
-                # common error checking on matched results
-                if not cells:
-                    continue
-                if len(cells) < 1:
-                    continue
-
-                # Acquire flags
-                flags = []
-                flag_entries = cells[0].find_all('i')
-                for entry in flag_entries:
-                    try:
-                        if entry['data-toggle'] != 'tooltip':
-                            continue
-                    except KeyError:
-                        continue
-                    try:
-                        flags += [ e.lower() for e in entry['class'] if e != 'flag' ]
-                    except KeyError:
-                        continue
-                # convert list
-                flags = set(flags)
-
-                # Get Hearing Impared Flag
-                hearing_impaired = ('text-cc' in flags)
-
-                # Get Link
-                link = cells[0].find('a', rel='nofollow')['href']
-                # Get ID
-                id = link[11:-9]
 
-                # Get releases (if defined)
-                releases = cells[0].find('span', class_='release')
-                if not releases:
-                    # Fall back to general name
-                    release = cells[0].find('a', href=link[:-9]).string
-
-                # Store Title
-                elif 'title' in releases:
-                    release = releases['title'].string
+        subtitles = self.parse_results(
+            soup, languages, series=series, season=season, episode=episode,
+            title=title, year=year)
+
+        # Set a hard cap on page count, there is really no reason to turn
+        # up more content then that; the languages share the pages
+        remaining = range(2, min(pages, self.max_pages * len(languages)) + 1)
+        if not remaining:
+            return subtitles
+
+        context = VideoMatchContext(video) if video is not None else None
+        good = dict((l, 0) for l in languages)
+        if context is not None:
+            self.count_good_matches(good, subtitles, video, context)
+        pool = ThreadPool(min(self.page_workers, len(remaining)))
+        try:
+            while remaining:
+                if min(good.values()) >= self.enough_subtitles:
+                    logger.debug('Enough good subtitles found, skipping %d page(s)', len(remaining))
+                    break
+
+                wave = remaining[:self.page_workers]
+                remaining = remaining[self.page_workers:]
+                results = pool.map(
+                    lambda page: self.get(
+                        '/subtitles/search/advanced',
+                        params=dict(params, page=str(page)),
+                        parse_only=self.results_strainer,
+                    ),
+                    wave,
+                )
+                for soup, _ in results:
+                    found = self.parse_results(
+                        soup, languages, series=series, season=season,
+                        episode=episode, title=title, year=year)
+                    if context is not None:
+                        self.count_good_matches(good, found, video, context)
+                    subtitles.extend(found)
+        except:
+            # do not wait for the pages still being fetched
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            # no worker thread outlives the query
+            pool.join()
 
-                else:
-                    release = releases.string
+        return subtitles
 
+    @staticmethod
+    def get_page_count(soup):
+        """Return the number of pages of results of a search page"""
+        pagination = soup.find('ul', class_='pagination')
+        if not pagination:
+            return 1
+        pages = 1
+        for bullet in pagination('li'):
+            try:
+                pages = max(pages, int(bullet.get_text().strip()))
+            except ValueError:
+                # previous/next links
+                continue
+        return pages
+
+    @staticmethod
+    def count_good_matches(good, subtitles, video, context):
+        """Count the `subtitles` that match every release detail the `video`
+        has in the `good` counts by language
+
+        The search itself takes care of the series, season and episode or the
+        title and year, the release details are what sets subtitles apart.
+        A `video` without any release detail has no subtitle counted, every
+        page is then fetched
+        """
+        wanted = set(m for m in ('release_group', 'resolution', 'video_codec')
+                     if getattr(video, m, None))
+        if not wanted:
+            return
+        for subtitle in subtitles:
+            if wanted <= subtitle.compute_matches(video, context):
+                good[subtitle.language] += 1
+
+    @staticmethod
+    def get_language(link, languages):
+        """Find which of the `languages` a subtitle is in from its `link`,
+        such as ``/subtitles/en-the-show-2010-S01E02/AbCd/download``
+        """
+        if len(languages) == 1:
+            return next(iter(languages))
+        slug = link.split('/subtitles/', 1)[-1].lower()
+        # languages with a country (pt-br) before the plain ones (pt)
+        for language in sorted(languages, key=lambda l: l.country is None):
+            code = language.alpha2
+            if language.country:
+                code = '%s-%s' % (code, language.country.alpha2.lower())
+            if slug.startswith(code + '-'):
+                return language
+        return None
+
+    def parse_results(self, soup, languages, series=None, season=None, episode=None, title=None, year=None):
+        """Parse the subtitles listed on a search page"""
+        subtitles = []
+        for row in soup('tr', class_='subtitle-entry'):
+            cells = row('td')
+            # common error checking on matched results
+            if not cells:
+                continue
+            if len(cells) < 1:
+                continue
+
+            # Acquire flags
+            flags = []
+            flag_entries = cells[0].find_all('i')
+            for entry in flag_entries:
                 try:
-                    release = unicode(release)
-
-                except UnicodeError:
-                    release = release.decode(detect(
-                        release,
-                        language.alpha2)['encoding'],
-                        'replace',
-                    )
-
-                # store name
-                releases = [ release.strip(), ]
-
-                # attempt to match against multi listings (if they exist)
-                multi_release = cells[0].find_all('div', class_='release')
-                if len(multi_release):
-                    for r in multi_release:
-                        releases.append(r.get_text())
-                if isinstance(releases, basestring):
-                    releases = [ releases, ]
-
-                # Simplify list by making it unique
-                releases = list(set(releases))
-
-                if series and season and episode:
-                    try:
-                        subtitles.append(
-                            PodnapisiSubtitle(
-                                language, id, releases,
-                                hearing_impaired, link,
-                                series=series, season=season, episode=episode,
-                        ))
-                    except AttributeError:
-                        # there simply wasn't enough information in the TV Show
-                        # gracefully handle this instead of crashing :)
-                        continue
-                elif title:
-                    try:
-                        subtitles.append(
-                            PodnapisiSubtitle(
-                                language, id, releases,
-                                hearing_impaired, link,
-                                title=title, year=year,
-                        ))
-                    except AttributeError:
-                        # there simply wasn't enough information in the movie
-                        # gracefully handle this instead of crashing :)
+                    if entry['data-toggle'] != 'tooltip':
                         continue
-                    pass
-
-            # Handle multiple pages
-            page += 1
-            if page > pages:
-                # We're done
-                break
-            # Store new page
-            params['page'] = str(page)
-            soup = self.get('/subtitles/search/advanced', params)
+                except KeyError:
+                    continue
+                try:
+                    flags += [ e.lower() for e in entry['class'] if e != 'flag' ]
+                except KeyError:
+                    continue
+            # convert list
+            flags = set(flags)
+
+            # Get Hearing Impared Flag
+            hearing_impaired = ('text-cc' in flags)
+
+            # Get Link
+            link = cells[0].find('a', rel='nofollow')['href']
+            # Get ID
+            id = link[11:-9]
+
+            # Get Language
+            language = self.get_language(link, languages)
+            if language is None:
+                logger.debug('Could not tell the language of %r', link)
+                continue
+
+            # Get releases (if defined)
+            releases = cells[0].find('span', class_='release')
+            if not releases:
+                # Fall back to general name
+                release = cells[0].find('a', href=link[:-9]).string
+
+            # Store Title
+            elif 'title' in releases:
+                release = releases['title'].string
+
+            else:
+                release = releases.string
+
+            try:
+                release = unicode(release)
+
+            except UnicodeError:
+                release = release.decode(detect(
+                    release,
+                    language.alpha2)['encoding'],
+                    'replace',
+                )
+
+            # store name
+            releases = [ release.strip(), ]
+
+            # attempt to match against multi listings (if they exist)
+            multi_release = cells[0].find_all('div', class_='release')
+            if len(multi_release):
+                for r in multi_release:
+                    releases.append(r.get_text())
+            if isinstance(releases, basestring):
+                releases = [ releases, ]
+
+            # Simplify list by making it unique
+            releases = list(set(releases))
+
+            if series and season and episode:
+                try:
+                    subtitles.append(
+                        PodnapisiSubtitle(
+                            language, id, releases,
+                            hearing_impaired, link,
+                            series=series, season=season, episode=episode,
+                    ))
+                except AttributeError:
+                    # there simply wasn't enough information in the TV Show
+                    # gracefully handle this instead of crashing :)
+                    continue
+            elif title:
+                try:
+                    subtitles.append(
+                        PodnapisiSubtitle(
+                            language, id, releases,
+                            hearing_impaired, link,
+                            title=title, year=year,
+                    ))
+                except AttributeError:
+                    # there simply wasn't enough information in the movie
+                    # gracefully handle this instead of crashing :)
+                    continue
+                pass
 
         return subtitles
 
     def list_subtitles(self, video, languages):
         if isinstance(video, Episode):
-            return [s for l in languages \
-                    for s in self.query(l, series=video.series,
-                                        season=video.season,
-                                        episode=video.episode)]
+            return self.query(languages, series=video.series,
+                              season=video.season, episode=video.episode,
+                              video=video)
         elif isinstance(video, Movie):
-            return [s for l in languages \
-                    for s in self.query(l, title=video.title,
-                                        year=video.year)]
+            return self.query(languages, title=video.title,
+                              year=video.year, video=video)
 
     def download_subtitle(self, subtitle):
         try:
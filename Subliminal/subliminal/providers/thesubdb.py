@@ -3,10 +3,10 @@ from __future__ import unicode_literals
 import logging
 import babelfish
 import requests
-from . import Provider
+from . import Provider, sessions
 from .. import __version__
 from ..exceptions import InvalidSubtitle, ProviderNotAvailable, ProviderError
-from ..subtitle import Subtitle, is_valid_subtitle, detect
+from ..subtitle import Subtitle, VideoMatchContext, is_valid_subtitle, detect
 
 
 logger = logging.getLogger(__name__)
@@ -19,10 +19,12 @@ class TheSubDBSubtitle(Subtitle):
         super(TheSubDBSubtitle, self).__init__(language)
         self.hash = hash
 
-    def compute_matches(self, video):
+    def compute_matches(self, video, context=None):
+        if context is None:
+            context = VideoMatchContext(video)
         matches = set()
         # hash
-        if 'thesubdb' in video.hashes and video.hashes['thesubdb'] == self.hash:
+        if 'thesubdb' in context.hashes and context.hashes['thesubdb'] == self.hash:
             matches.add('hash')
         return matches
 
@@ -30,14 +32,17 @@ class TheSubDBSubtitle(Subtitle):
 class TheSubDBProvider(Provider):
     languages = set([babelfish.Language.fromalpha2(l) for l in ['en', 'es', 'fr', 'it', 'nl', 'pl', 'pt', 'ro', 'sv', 'tr']])
     required_hash = 'thesubdb'
+    hashes = set(['thesubdb'])
+    server = 'http://api.thesubdb.com'
 
     def initialize(self):
-        self.session = requests.Session()
-        self.session.headers = {'User-Agent': 'SubDB/1.0 (subliminal/%s; https://github.com/Diaoul/subliminal)' %
-                                __version__}
+        self.session = sessions.get(self.server, headers={
+            'User-Agent': 'SubDB/1.0 (subliminal/%s; https://github.com/Diaoul/subliminal)' % __version__,
+        })
 
     def terminate(self):
-        self.session.close()
+        # the session is shared with the next instances, it is not closed
+        self.session = None
 
     def get(self, params):
         """Make a GET request on the server with the given parameters
@@ -49,7 +54,7 @@ class TheSubDBProvider(Provider):
 
         """
         try:
-            r = self.session.get('http://api.thesubdb.com', params=params, timeout=10)
+            r = self.session.get(self.server, params=params, timeout=10)
         except requests.Timeout:
             raise ProviderNotAvailable('Timeout after 10 seconds')
         return r
@@ -75,7 +80,7 @@ class TheSubDBProvider(Provider):
         if r.status_code != 200:
             raise ProviderError('Request failed with status code %d' % r.status_code)
         logger.debug('Download URL: %s {hash=%s, lang=%s}' % (
-            'http://api.thesubdb.com', subtitle.hash, subtitle.language.alpha2,
+            self.server, subtitle.hash, subtitle.language.alpha2,
         ))
         subtitle_text = r.content.decode(
             detect(r.content, subtitle.language.alpha2)['encoding'], 'replace')
@@ -8,16 +8,19 @@ import zipfile
 import babelfish
 import bs4
 import requests
-from . import Provider
+from . import Provider, parse_html, has_class, sessions
 from ..cache import region
 from ..exceptions import InvalidSubtitle, ProviderNotAvailable, ProviderError
-from ..subtitle import Subtitle, is_valid_subtitle, sanitize_string, detect
+from ..subtitle import Subtitle, VideoMatchContext, is_valid_subtitle, sanitize_string, detect
 from ..video import Episode
 
 IGNORE_DATEMATCH=re.compile('^(.*)[ \t0-9-._)(]*$')
 
 logger = logging.getLogger(__name__)
 
+#: Time after which a cached season page is revalidated, in seconds
+EPISODES_REVALIDATION_TIME = 60 * 60
+
 
 class TVsubtitlesSubtitle(Subtitle):
     provider_name = 'tvsubtitles'
@@ -31,10 +34,12 @@ class TVsubtitlesSubtitle(Subtitle):
         self.rip = rip
         self.release = release
 
-    def compute_matches(self, video):
+    def compute_matches(self, video, context=None):
+        if context is None:
+            context = VideoMatchContext(video)
         matches = set()
         # series
-        if video.series and self.series == video.series:
+        if context.series and self.series == context.series:
             matches.add('series')
         # season
         if video.season and self.season == video.season:
@@ -42,15 +47,16 @@ class TVsubtitlesSubtitle(Subtitle):
         # episode
         if video.episode and self.episode == video.episode:
             matches.add('episode')
+        release = self.release.lower() if self.release else None
         # release_group
-        if video.release_group and self.release and video.release_group.lower() in self.release.lower():
+        if context.release_group and release and context.release_group_lower in release:
             matches.add('release_group')
         # video_codec
-        if video.video_codec and self.release and (video.video_codec in self.release.lower()
-                                                   or video.video_codec == 'h264' and 'x264' in self.release.lower()):
+        if context.video_codec and release and (context.video_codec in release
+                                                or context.video_codec == 'h264' and 'x264' in release):
             matches.add('video_codec')
         # resolution
-        if video.resolution and self.rip and video.resolution in self.rip.lower():
+        if context.resolution and self.rip and context.resolution in self.rip.lower():
             matches.add('resolution')
         return matches
 
@@ -66,19 +72,21 @@ class TVsubtitlesProvider(Provider):
     link_re = re.compile('^(?P<series>.+) \(\d{4}-\d{4}\)$')
 
     def initialize(self):
-        self.session = requests.Session()
-        self.session.headers = {'User-Agent': self.primary_user_agent }
+        self.session = sessions.get(self.server, headers={'User-Agent': self.primary_user_agent})
 
     def terminate(self):
-        self.session.close()
+        # the session is shared with the next instances, it is not closed
+        self.session = None
 
-    def request(self, url, params=None, data=None, method='GET'):
+    def request(self, url, params=None, data=None, method='GET', parse_only=None):
         """Make a `method` request on `url` with the given parameters
 
         :param string url: part of the URL to reach with the leading slash
         :param dict params: params of the request
         :param dict data: data of the request
         :param string method: method of the request
+        :param parse_only: the elements of the page to parse, see :func:`~subliminal.providers.parse_html`
+        :type parse_only: :class:`bs4.SoupStrainer`
         :return: the response
         :rtype: :class:`bs4.BeautifulSoup`
         :raise: :class:`~subliminal.exceptions.ProviderNotAvailable`
@@ -90,7 +98,7 @@ class TVsubtitlesProvider(Provider):
             raise ProviderNotAvailable('Timeout after 10 seconds')
         if r.status_code != 200:
             raise ProviderNotAvailable('Request failed with status code %d' % r.status_code)
-        return bs4.BeautifulSoup(r.content, ['permissive'])
+        return parse_html(r.content, parse_only)
 
     @region.cache_on_arguments()
     def find_show_id(self, series):
@@ -103,7 +111,8 @@ class TVsubtitlesProvider(Provider):
         """
         data = {'q': series}
         logger.debug('Searching series %r', data)
-        soup = self.request('/search.php', data=data, method='POST')
+        soup = self.request('/search.php', data=data, method='POST',
+                            parse_only=bs4.SoupStrainer('div', class_=has_class('left')))
         links = soup.select('div.left li div a[href^="/tvshow-"]')
         sanitized_series = IGNORE_DATEMATCH.match(
             sanitize_string(series).replace('.', ' ').strip(),
@@ -136,10 +145,12 @@ class TVsubtitlesProvider(Provider):
                 return int(link['href'][8:-5])
         return int(links[0]['href'][8:-5])
 
-    @region.cache_on_arguments()
     def find_episode_ids(self, show_id, season):
         """Find episode ids from the show id and the season
 
+        The season page is cached and revalidated with a conditional request, more often than the
+        other pages as episodes are added to it, see :meth:`~subliminal.providers.Provider.get_cached_page`
+
         :param int show_id: show id
         :param int season: season of the episode
         :return: episode ids per episode number
@@ -148,7 +159,12 @@ class TVsubtitlesProvider(Provider):
         """
         params = {'show_id': show_id, 'season': season}
         logger.debug('Searching episodes %r', params)
-        soup = self.request('/tvshow-{show_id}-{season}.html'.format(**params))
+        return self.get_cached_page('/tvshow-{show_id}-{season}.html'.format(**params), self.parse_episode_ids,
+                                    parse_only=bs4.SoupStrainer('table', id='table5'),
+                                    revalidation_time=EPISODES_REVALIDATION_TIME)
+
+    def parse_episode_ids(self, soup):
+        """Parse the episode ids per episode number of a season page"""
         episode_ids = {}
         for row in soup.select('table#table5 tr'):
             if not row('a', href=self.episode_id_re):
@@ -167,7 +183,8 @@ class TVsubtitlesProvider(Provider):
             return []
         params = {'episode_id': episode_ids[episode]}
         logger.debug('Searching episode %r', params)
-        soup = self.request('/episode-{episode_id}.html'.format(**params))
+        soup = self.request('/episode-{episode_id}.html'.format(**params),
+                            parse_only=bs4.SoupStrainer('a', href=self.subtitle_re))
         return [TVsubtitlesSubtitle(babelfish.Language.fromtvsubtitles(row.h5.img['src'][13:-4]), series, season,
                                     episode, row['href'][10:-5], row.find('p', title='rip').text.strip() or None,
                                     row.find('p', title='release').text.strip() or None)
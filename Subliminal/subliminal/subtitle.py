@@ -107,11 +107,40 @@ STRING_SANITIZATION_RE = re.compile(
 logger = logging.getLogger(__name__)
 
 #  The following characters are always stripped
-IGNORED_CHARACTERS_RE = re.compile('[!@#$\'"]')
+IGNORED_CHARACTERS = '!@#$\'"'
+IGNORED_CHARACTERS_RE = re.compile('[%s]' % IGNORED_CHARACTERS)
 
 # non-printable ascii characters
 PRINTABLE_ASCII_RE = re.compile(r'[^\x20-\x7E]+')
 
+# The number of sanitized strings remembered by sanitize_string(); the
+# memo is simply emptied once it is full
+SANITIZE_CACHE_SIZE = 2048
+
+
+class SanitizationTable(dict):
+    """
+    A unicode.translate() table that applies STRING_SANITIZATION, drops the
+    IGNORED_CHARACTERS and drops anything else that isn't printable ascii in
+    a single pass. Entries are resolved (and kept) the first time a
+    character is looked up.
+    """
+    def __init__(self):
+        super(SanitizationTable, self).__init__(
+            (ord(k), v) for (k, v) in STRING_SANITIZATION.items())
+        self.update((ord(c), None) for c in IGNORED_CHARACTERS)
+
+    def __missing__(self, key):
+        # printable ascii characters are left alone
+        value = unichr(key) if 0x20 <= key <= 0x7E else None
+        self[key] = value
+        return value
+
+SANITIZATION_TABLE = SanitizationTable()
+
+# Results of sanitize_string()
+_sanitize_cache = {}
+
 # Date parsing
 STRIP_DATE_RE = re.compile('^\s*([^\[(]+)[\s\[(]?\s*([123][0-9]{3})[\s\])]?\s*$')
 
@@ -167,6 +196,48 @@ def detect(str_data, lang=None):
     }
 
 
+class VideoMatchContext(object):
+    """Values of a :class:`~subliminal.video.Video` that subtitles are matched against
+
+    Lowercasing and sanitizing the video's strings is done once here instead of for
+    every candidate subtitle; build it once per video and pass it to
+    :meth:`Subtitle.compute_score` for each candidate.
+
+    :param video: the video to match subtitles against
+    :type video: :class:`~subliminal.video.Video`
+
+    """
+    def __init__(self, video):
+        self.video = video
+        self.hashes = video.hashes
+        self.imdb_id = video.imdb_id
+        self.tvdb_id = getattr(video, 'tvdb_id', None)
+        self.resolution = video.resolution
+        self.video_codec = video.video_codec
+        self.audio_codec = video.audio_codec
+        self.release_group = video.release_group
+        self.release_group_lower = video.release_group.lower() if video.release_group else None
+
+        self.series = getattr(video, 'series', None)
+        self.series_lower = None
+        self.series_sanitized = None
+        self.series_sanitized_no_date = None
+        if self.series:
+            self.series_lower = self.series.lower()
+            self.series_sanitized = sanitize_string(self.series)
+            self.series_sanitized_no_date = sanitize_string(self.series, strip_date=True)
+
+        self.title = getattr(video, 'title', None)
+        self.title_lower = None
+        self.title_sanitized = None
+        if self.title:
+            self.title_lower = self.title.lower()
+            self.title_sanitized = sanitize_string(self.title)
+
+    def __repr__(self):
+        return '<%s [%r]>' % (self.__class__.__name__, self.video)
+
+
 class Subtitle(object):
     """Base class for subtitle
 
@@ -179,18 +250,20 @@ class Subtitle(object):
         self.language = language
         self.hearing_impaired = hearing_impaired
 
-    def compute_matches(self, video):
+    def compute_matches(self, video, context=None):
         """Compute the matches of the subtitle against the `video`
 
         :param video: the video to compute the matches against
         :type video: :class:`~subliminal.video.Video`
+        :param context: precomputed values of the `video`, built if not given
+        :type context: :class:`VideoMatchContext`
         :return: matches of the subtitle
         :rtype: set
 
         """
         raise NotImplementedError
 
-    def compute_score(self, video, hi_score_adjust=0):
+    def compute_score(self, video, hi_score_adjust=0, context=None):
         """Compute the score of the subtitle against the `video`
 
         There are equivalent matches so that a provider can match one element or its equivalent. This is
@@ -205,13 +278,17 @@ class Subtitle(object):
         :param video: the video to compute the score against
         :type video: :class:`~subliminal.video.Video`
         :param hi_score_adjust: adjust hearing impaired matched videos by this value
+        :param context: precomputed values of the `video`, built if not given
+        :type context: :class:`VideoMatchContext`
         :return: score of the subtitle
         :rtype: int
 
         """
         score = 0
+        if context is None:
+            context = VideoMatchContext(video)
         # compute matches
-        initial_matches = self.compute_matches(video)
+        initial_matches = self.compute_matches(video, context)
         matches = initial_matches.copy()
         # hash is the perfect match
         if 'hash' in matches:
@@ -268,18 +345,21 @@ def sanitize_string(str_in, strip_date=False):
         # handle int, float, etc
         str_in = str(str_in)
 
-    # First we do best guess placement of all unicode characters
-    # to their ascii equivalent (if it's possible.
-    str_out = STRING_SANITIZATION_RE.sub(
-        lambda x: STRING_SANITIZATION[x.group()], str_in)
+    if isinstance(str_in, str):
+        # only the printable ascii characters of a byte string are kept
+        str_in = str_in.decode('ascii', 'ignore')
 
-    # Now we strip out anything that isn't printable still
-    # lingering
-    str_out = PRINTABLE_ASCII_RE.sub('', str_out)
+    key = (str_in, strip_date)
+    try:
+        return _sanitize_cache[key]
 
-    # Finally eliminate any extra printable characters that
-    # really just should't be used.
-    str_out = IGNORED_CHARACTERS_RE.sub('', str_out).lower()
+    except KeyError:
+        pass
+
+    # Map all unicode characters to their ascii equivalent (if it's
+    # possible) and strip out anything that isn't printable or that
+    # really just should't be used in a single pass.
+    str_out = str_in.translate(SANITIZATION_TABLE).lower()
 
     str_date_re = STRIP_DATE_RE.match(str_out)
     if str_date_re:
@@ -287,7 +367,12 @@ def sanitize_string(str_in, strip_date=False):
         if not strip_date and str_date_re.group(2):
             str_out += ' ' + str_date_re.group(2)
 
-    return str_out.strip()
+    str_out = str_out.strip()
+    if len(_sanitize_cache) >= SANITIZE_CACHE_SIZE:
+        _sanitize_cache.clear()
+
+    _sanitize_cache[key] = str_out
+    return str_out
 
 def get_subtitle_path(video_path, language=None):
     """Create the subtitle path from the given `video_path` and `language`
@@ -333,21 +418,25 @@ def is_valid_subtitle(subtitle_text):
     return False
 
 
-def compute_guess_matches(video, guess):
+def compute_guess_matches(video, guess, context=None):
     """Compute matches between a `video` and a `guess`
 
     :param video: the video to compute the matches on
     :type video: :class:`~subliminal.video.Video`
     :param guess: the guess to compute the matches on
     :type guess: :class:`guessit.Guess`
+    :param context: precomputed values of the `video`, built if not given
+    :type context: :class:`VideoMatchContext`
     :return: matches of the `guess`
     :rtype: set
 
     """
+    if context is None:
+        context = VideoMatchContext(video)
     matches = set()
     if isinstance(video, Episode):
         # Series
-        if video.series and 'series' in guess and guess['series'].lower() == video.series.lower():
+        if context.series and 'series' in guess and guess['series'].lower() == context.series_lower:
             matches.add('series')
         # Season
         if video.season and 'seasonNumber' in guess and guess['seasonNumber'] == video.season:
@@ -360,18 +449,19 @@ def compute_guess_matches(video, guess):
         if video.year and 'year' in guess and guess['year'] == video.year:
             matches.add('year')
     # Title
-    if video.title and 'title' in guess and guess['title'].lower() == video.title.lower():
+    if context.title and 'title' in guess and guess['title'].lower() == context.title_lower:
         matches.add('title')
     # Release group
-    if video.release_group and 'releaseGroup' in guess and guess['releaseGroup'].lower() == video.release_group.lower():
+    if context.release_group and 'releaseGroup' in guess and \
+            guess['releaseGroup'].lower() == context.release_group_lower:
         matches.add('release_group')
     # Screen size
-    if video.resolution and 'screenSize' in guess and guess['screenSize'] == video.resolution:
+    if context.resolution and 'screenSize' in guess and guess['screenSize'] == context.resolution:
         matches.add('resolution')
     # Video codec
-    if video.video_codec and 'videoCodec' in guess and guess['videoCodec'] == video.video_codec:
+    if context.video_codec and 'videoCodec' in guess and guess['videoCodec'] == context.video_codec:
         matches.add('video_codec')
     # Audio codec
-    if video.audio_codec and 'audioCodec' in guess and guess['audioCodec'] == video.audio_codec:
+    if context.audio_codec and 'audioCodec' in guess and guess['audioCodec'] == context.audio_codec:
         matches.add('audio_codec')
     return matches
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
+import bisect
 import datetime
 import hashlib
 import logging
@@ -24,6 +25,19 @@ VIDEO_EXTENSIONS = ('.3g2', '.3gp', '.3gp2', '.3gpp', '.60d', '.ajp', '.asf', '.
 #: Subtitle extensions
 SUBTITLE_EXTENSIONS = ('.srt', '.sub', '.smi', '.txt', '.ssa', '.ass', '.mpl')
 
+#: Video codecs by Matroska codec id, MP4 sample entry type or AVI FourCC
+VIDEO_CODECS = {'V_MPEG4/ISO/AVC': 'h264', 'V_MPEG4/ISO/SP': 'DivX', 'V_MPEG4/ISO/ASP': 'XviD',
+                'avc1': 'h264', 'avc3': 'h264',
+                'XVID': 'XviD', 'xvid': 'XviD', 'DIVX': 'DivX', 'divx': 'DivX', 'DX50': 'DivX', 'DIV3': 'DivX',
+                'H264': 'h264', 'h264': 'h264', 'X264': 'h264', 'x264': 'h264', 'AVC1': 'h264'}
+
+#: Audio codecs by Matroska codec id, MP4 sample entry type or AVI format tag
+AUDIO_CODECS = {'A_AC3': 'AC3', 'A_DTS': 'DTS', 'A_AAC': 'AAC',
+                'ac-3': 'AC3', 'dtsc': 'DTS', 'dtsh': 'DTS', 'dtsl': 'DTS',
+                'mp4a.40': 'AAC', 'mp4a.66': 'AAC', 'mp4a.67': 'AAC', 'mp4a.68': 'AAC', 'mp4a.69': 'MP3',
+                'mp4a.6b': 'MP3',
+                '0x2000': 'AC3', '0x2001': 'DTS', '0x00ff': 'AAC'}
+
 
 class Video(object):
     """Base class for videos
@@ -176,6 +190,170 @@ class Movie(Video):
                 and self.title == other.title\
                 and self.year == other.year
 
+
+class VideoHashes(dict):
+    """Hashes of a video file by provider names, computed on first access
+
+    Membership tells whether a hash is available without computing it so that checking a
+    provider does not read the file; a hash that cannot be computed is no longer available
+
+    :param string path: path to the video
+    :param names: names of the hashes that can be computed, see :data:`HASH_FUNCTIONS`
+    :type names: set of string
+
+    """
+    def __init__(self, path, names):
+        super(VideoHashes, self).__init__()
+        self.path = path
+        self.pending = set(names) & set(HASH_FUNCTIONS)
+
+    def __missing__(self, name):
+        if name not in self.pending:
+            raise KeyError(name)
+        self.pending.discard(name)
+        try:
+            value = HASH_FUNCTIONS[name](self.path)
+        except (IOError, OSError):
+            logger.warning('Could not compute %s hash of %r', name, self.path)
+            raise KeyError(name)
+        logger.debug('Computed %s hash %r', name, value)
+        self[name] = value
+        return value
+
+    def __contains__(self, name):
+        return name in self.pending or super(VideoHashes, self).__contains__(name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def compute(self):
+        """Compute the hashes not computed yet rather than on their first access"""
+        for name in sorted(self.pending):
+            self.get(name)
+
+
+class SubtitleDirectory(object):
+    """Subtitle files of a directory, indexed from a single listing
+
+    Files are indexed by their name without extension so that looking up the subtitles
+    of a video does not list the directory again
+
+    :param string dirpath: path to the directory
+    :param float mtime: modification time of the directory when listed, read if not given
+
+    """
+    def __init__(self, dirpath, mtime=None):
+        self.dirpath = dirpath
+        #: Modification time of the directory when it was listed
+        self.mtime = mtime if mtime is not None else os.stat(dirpath).st_mtime
+        #: Extensions of the subtitle files by file name without extension
+        self.roots = {}
+        #: Names without extension by lowercased name without extension
+        self.lower_roots = {}
+        for p in os.listdir(dirpath):
+            root, ext = os.path.splitext(p)
+            if ext.lower() not in SUBTITLE_EXTENSIONS + ('.idx',):
+                continue
+            if root not in self.roots:
+                self.roots[root] = set()
+                self.lower_roots.setdefault(root.lower(), []).append(root)
+            self.roots[root].add(ext)
+        #: Sorted names without extension, for prefix lookups. Undecoded names are left out as they
+        #: cannot be compared with the others
+        self.sorted_roots = sorted(r for r in self.roots if not isinstance(r, bytes))
+
+    def subtitle_languages(self, filename):
+        """Get the languages of the subtitles starting with the name of the video `filename`
+        and with a subtitle extension, the language being their alpha2 extension if any
+
+        :param string filename: name of the video
+        :return: found subtitle languages
+        :rtype: set
+
+        """
+        prefix = os.path.splitext(filename)[0]
+        subtitles = set()
+        if isinstance(prefix, bytes):
+            return subtitles
+        for i in range(bisect.bisect_left(self.sorted_roots, prefix), len(self.sorted_roots)):
+            root = self.sorted_roots[i]
+            if not root.startswith(prefix):
+                break
+            if not [e for e in self.roots[root] if e in SUBTITLE_EXTENSIONS]:
+                continue
+            if root[-3:-2] == '.' and root[-2:] in get_alpha2_codes():
+                subtitles.add(babelfish.Language.fromalpha2(root[-2:]))
+            else:
+                subtitles.add(babelfish.Language('und'))
+        return subtitles
+
+    def find_subtitles(self, filename, codes, extensions=('.idx', '.sub', '.srt')):
+        """Find the subtitle files of the video `filename`, named after it with no language extension or
+        with one of the language `codes`, ignoring case
+
+        :param string filename: name of the video
+        :param list codes: language codes, e.g. alpha2 and alpha3 codes
+        :param tuple extensions: subtitle extensions
+        :return: names of the subtitle files
+        :rtype: list
+
+        """
+        stem = os.path.splitext(filename)[0].lower()
+        names = []
+        for key in [stem] + ['%s.%s' % (stem, c.lower()) for c in codes]:
+            for root in self.lower_roots.get(key, []):
+                for ext in self.roots[root]:
+                    if ext.lower() in extensions and os.path.isfile(os.path.join(self.dirpath, root + ext)):
+                        names.append(root + ext)
+        return sorted(set(names))
+
+
+def get_alpha2_codes():
+    """Get the alpha2 language codes, computed once"""
+    global _alpha2_codes
+    if _alpha2_codes is None:
+        _alpha2_codes = frozenset(babelfish.language_converters['alpha2'].codes)
+    return _alpha2_codes
+
+_alpha2_codes = None
+
+#: :class:`SubtitleDirectory` by directory path, see :func:`get_subtitle_directory`
+_subtitle_directories = {}
+
+
+def get_subtitle_directory(dirpath):
+    """Get the :class:`SubtitleDirectory` of `dirpath`, listed again only when the modification
+    time of the directory changed since
+
+    Call :func:`clear_subtitle_directories` to forget the listings that are no longer needed
+
+    :param string dirpath: path to the directory
+    :rtype: :class:`SubtitleDirectory`
+
+    """
+    dirpath = os.path.abspath(dirpath)
+    mtime = os.stat(dirpath).st_mtime
+    directory = _subtitle_directories.get(dirpath)
+    if directory is None or directory.mtime != mtime:
+        directory = _subtitle_directories[dirpath] = SubtitleDirectory(dirpath, mtime)
+    return directory
+
+
+def clear_subtitle_directories(dirpath=None):
+    """Forget the listing of `dirpath`, or of all directories
+
+    :param string dirpath: path to the directory
+
+    """
+    if dirpath is None:
+        _subtitle_directories.clear()
+    else:
+        _subtitle_directories.pop(os.path.abspath(dirpath), None)
+
+
 def scan_subtitle_languages(path):
     """Search for subtitles with alpha2 extension from a video `path` and return their language
 
@@ -184,27 +362,25 @@ def scan_subtitle_languages(path):
     :rtype: set
 
     """
-    language_extensions = tuple('.' + c for c in babelfish.language_converters['alpha2'].codes)
     dirpath, filename = os.path.split(path)
-    subtitles = set()
-    for p in os.listdir(dirpath):
-        if not isinstance(p, bytes) and p.startswith(os.path.splitext(filename)[0]) and p.endswith(SUBTITLE_EXTENSIONS):
-            if os.path.splitext(p)[0].endswith(language_extensions):
-                subtitles.add(babelfish.Language.fromalpha2(os.path.splitext(p)[0][-2:]))
-            else:
-                subtitles.add(babelfish.Language('und'))
+    subtitles = get_subtitle_directory(dirpath).subtitle_languages(filename)
     logger.debug('Found subtitles %r', subtitles)
     return subtitles
 
 
-def scan_video(path, subtitles=True, embedded_subtitles=True, video=None):
+def scan_video(path, subtitles=True, embedded_subtitles=True, video=None, hashes=None):
     """Scan a video and its subtitle languages from a video `path`
 
+    Hashes are computed on first access, see :class:`VideoHashes`
+
     :param string path: absolute path to the video
     :param bool subtitles: scan for subtitles with the same name
     :param bool embedded_subtitles: scan for embedded subtitles
     :parm :class:`Video`: optionally specify a video if you've already detected on
                           by other means.
+    :param hashes: names of the hashes that can be computed, all if None (see
+        :func:`~subliminal.api.get_provider_hashes`)
+    :type hashes: set of string or None
     :return: the scanned video
     :rtype: :class:`Video`
     :raise: ValueError if cannot guess enough information from the path
@@ -222,20 +398,36 @@ def scan_video(path, subtitles=True, embedded_subtitles=True, video=None):
     video.size = os.path.getsize(path)
     if video.size > 10485760:
         logger.debug('Size is %d', video.size)
-        video.hashes['opensubtitles'] = hash_opensubtitles(path)
-        video.hashes['thesubdb'] = hash_thesubdb(path)
-        logger.debug('Computed hashes %r', video.hashes)
+        video_hashes = VideoHashes(path, HASH_FUNCTIONS if hashes is None else hashes)
+        video_hashes.update(video.hashes)
+        video.hashes = video_hashes
+        logger.debug('Hashes %r computed on first access', sorted(video_hashes.pending))
     else:
         logger.warning('Size is lower than 10MB: hashes not computed')
     if subtitles:
         video.subtitle_languages |= scan_subtitle_languages(path)
     # enzyme
     try:
+        tracks = None
         if re.match('.*\.mkv$', filename, re.IGNORECASE):
             with open(path, 'rb') as f:
-                mkv = enzyme.MKV(f)
-            if mkv.video_tracks:
-                video_track = mkv.video_tracks[0]
+                tracks = enzyme.probe_tracks(f)
+            from_language_code = babelfish.Language.fromalpha3b
+        elif re.match('.*\.(mp4|m4v)$', filename, re.IGNORECASE):
+            with open(path, 'rb') as f:
+                tracks = enzyme.probe_mp4_tracks(f)
+            # ISO 639-2/T codes
+            from_language_code = babelfish.Language
+        elif re.match('.*\.(avi|divx|xvid)$', filename, re.IGNORECASE):
+            with open(path, 'rb') as f:
+                tracks = enzyme.probe_avi_tracks(f)
+            from_language_code = babelfish.Language
+        if tracks is not None:
+            video_tracks = [t for t in tracks if t.type == enzyme.VIDEO_TRACK]
+            audio_tracks = [t for t in tracks if t.type == enzyme.AUDIO_TRACK]
+            subtitle_tracks = [t for t in tracks if t.type == enzyme.SUBTITLE_TRACK]
+            if video_tracks:
+                video_track = video_tracks[0]
                 # resolution
                 if video_track.height in (480, 720, 1080):
                     if video_track.interlaced:
@@ -245,40 +437,28 @@ def scan_video(path, subtitles=True, embedded_subtitles=True, video=None):
                         video.resolution = '%dp' % video_track.height
                         logger.debug('Found resolution %s with enzyme', video.resolution)
                 # video codec
-                if video_track.codec_id == 'V_MPEG4/ISO/AVC':
-                    video.video_codec = 'h264'
-                    logger.debug('Found video_codec %s with enzyme', video.video_codec)
-                elif video_track.codec_id == 'V_MPEG4/ISO/SP':
-                    video.video_codec = 'DivX'
-                    logger.debug('Found video_codec %s with enzyme', video.video_codec)
-                elif video_track.codec_id == 'V_MPEG4/ISO/ASP':
-                    video.video_codec = 'XviD'
+                if video_track.codec_id in VIDEO_CODECS:
+                    video.video_codec = VIDEO_CODECS[video_track.codec_id]
                     logger.debug('Found video_codec %s with enzyme', video.video_codec)
             else:
-                logger.warning('MKV has no video track')
-            if mkv.audio_tracks:
-                audio_track = mkv.audio_tracks[0]
+                logger.warning('Video has no video track')
+            if audio_tracks:
+                audio_track = audio_tracks[0]
                 # audio codec
-                if audio_track.codec_id == 'A_AC3':
-                    video.audio_codec = 'AC3'
-                    logger.debug('Found audio_codec %s with enzyme', video.audio_codec)
-                elif audio_track.codec_id == 'A_DTS':
-                    video.audio_codec = 'DTS'
-                    logger.debug('Found audio_codec %s with enzyme', video.audio_codec)
-                elif audio_track.codec_id == 'A_AAC':
-                    video.audio_codec = 'AAC'
+                if audio_track.codec_id in AUDIO_CODECS:
+                    video.audio_codec = AUDIO_CODECS[audio_track.codec_id]
                     logger.debug('Found audio_codec %s with enzyme', video.audio_codec)
             else:
-                logger.warning('MKV has no audio track')
-            if mkv.subtitle_tracks:
+                logger.warning('Video has no audio track')
+            if subtitle_tracks:
                 # embedded subtitles
                 if embedded_subtitles:
                     embedded_subtitle_languages = set()
-                    for st in mkv.subtitle_tracks:
+                    for st in subtitle_tracks:
                         if st.language:
                             try:
-                                embedded_subtitle_languages.add(babelfish.Language.fromalpha3b(st.language))
-                            except babelfish.Error:
+                                embedded_subtitle_languages.add(from_language_code(st.language))
+                            except (babelfish.Error, ValueError):
                                 logger.error('Embedded subtitle track language %r is not a valid language', st.language)
                                 embedded_subtitle_languages.add(babelfish.Language('und'))
                         elif st.name:
@@ -292,7 +472,7 @@ def scan_video(path, subtitles=True, embedded_subtitles=True, video=None):
                     logger.debug('Found embedded subtitle %r with enzyme', embedded_subtitle_languages)
                     video.subtitle_languages |= embedded_subtitle_languages
             else:
-                logger.debug('MKV has no subtitle track')
+                logger.debug('Video has no subtitle track')
     except enzyme.Error:
         logger.error('Parsing video metadata with enzyme failed')
     return video
@@ -415,3 +595,7 @@ def hash_thesubdb(video_path):
         f.seek(-readsize, os.SEEK_END)
         data += f.read(readsize)
     return hashlib.md5(data).hexdigest().decode('ascii')
+
+
+#: Hash functions by provider names
+HASH_FUNCTIONS = {'opensubtitles': hash_opensubtitles, 'thesubdb': hash_thesubdb}
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Subliminal provider page parsing benchmark
+#
+# Copyright (C) 2015-2019 Chris Caron <lead2gold@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with subliminal.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Checks and times the page parsing of the Addic7ed, TVsubtitles and
+Podnapisi providers against the saved pages of the pages/ directory.
+
+Every provider query is run twice on the same pages: once with the
+SoupStrainer each page is parsed with (only the elements the provider
+reads are built) and once with the whole page parsed. Both must give
+the same results; the time the pages took to parse is printed.
+
+Usage: python provider_pages.py [-n ROUNDS] [--without-lxml]
+"""
+import sys
+
+if '--without-lxml' in sys.argv:
+    # As on the systems lxml is not installed on: the whole pages are then
+    # parsed by html5lib and the strained ones by html.parser
+    sys.modules['lxml'] = None
+
+from os.path import join
+from os.path import dirname
+from os.path import abspath
+from optparse import OptionParser
+from time import time
+
+# The bundled libraries
+sys.path.insert(0, join(dirname(dirname(abspath(__file__))), 'Subliminal'))
+
+import babelfish
+from subliminal import cache_region
+from subliminal import providers
+from subliminal.providers import addic7ed
+from subliminal.providers import tvsubtitles
+from subliminal.providers import podnapisi
+
+# The saved pages
+PAGES_DIR = join(dirname(abspath(__file__)), 'pages')
+
+# The page served for each URL (without the server) by prefix
+PAGES = (
+    ('/shows.php', 'addic7ed_shows.html'),
+    ('/search.php?', 'addic7ed_search.html'),
+    ('/show/', 'addic7ed_season.html'),
+    ('/search.php', 'tvsubtitles_search.html'),
+    ('/tvshow-', 'tvsubtitles_season.html'),
+    ('/episode-', 'tvsubtitles_episode.html'),
+    ('/subtitles/search/advanced', 'podnapisi_search.html'),
+)
+
+# The modules parse_html() is used from
+PARSING_MODULES = (providers, addic7ed, tvsubtitles, podnapisi)
+
+
+class SavedResponse(object):
+    """A response served from a saved page"""
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+
+class SavedPages(object):
+    """A session serving the saved pages"""
+    def __init__(self, server):
+        self.server = server
+        self.pages = {}
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        path = url[len(self.server):]
+        if method == 'GET' and params:
+            # tells Addic7ed's search (GET) from TVsubtitles' (POST)
+            path += '?'
+
+        for prefix, filename in PAGES:
+            if path.startswith(prefix):
+                break
+        else:
+            raise ValueError('No saved page for %s' % url)
+
+        if filename not in self.pages:
+            with open(join(PAGES_DIR, filename), 'rb') as f:
+                self.pages[filename] = f.read()
+        return SavedResponse(url, self.pages[filename])
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+
+def query_addic7ed():
+    provider = addic7ed.Addic7edProvider()
+    provider.session = SavedPages(provider.server)
+    return (
+        provider.find_show_id('Doctor Who'),
+        provider.query('The Walking Dead', 4),
+    )
+
+
+def query_tvsubtitles():
+    provider = tvsubtitles.TVsubtitlesProvider()
+    provider.session = SavedPages(provider.server)
+    return (
+        provider.find_episode_ids(68, 7),
+        provider.query('Doctor Who', 7, 5),
+    )
+
+
+def query_podnapisi():
+    provider = podnapisi.PodnapisiProvider()
+    provider.initialize()
+    provider.session = SavedPages(provider.server)
+    languages = set([
+        babelfish.Language('eng'),
+        babelfish.Language('fra'),
+        babelfish.Language('por', 'BR'),
+    ])
+    return provider.query(
+        languages, series='The Big Bang Theory', season=7, episode=12)
+
+
+QUERIES = (
+    ('addic7ed', query_addic7ed),
+    ('tvsubtitles', query_tvsubtitles),
+    ('podnapisi', query_podnapisi),
+)
+
+
+def comparable(value):
+    """The results of a query in a form that can be compared"""
+    if isinstance(value, (list, tuple)):
+        return [comparable(v) for v in value]
+
+    if isinstance(value, dict):
+        return sorted((k, comparable(v)) for k, v in value.items())
+
+    if hasattr(value, 'provider_name'):
+        # A subtitle
+        return (value.__class__.__name__, sorted(
+            (k, v) for k, v in vars(value).items()
+            if k != 'release_guesses'))
+
+    return value
+
+
+def run(query, rounds, strained):
+    """
+    Runs a query, returns its results and the best time its pages took to
+    parse over the rounds
+    """
+    parse_html = providers.parse_html
+    parsing = [0]
+
+    def timed_parse_html(content, parse_only=None):
+        if not strained:
+            parse_only = None
+
+        start = time()
+        try:
+            return parse_html(content, parse_only)
+
+        finally:
+            parsing[0] += time() - start
+
+    for module in PARSING_MODULES:
+        module.parse_html = timed_parse_html
+
+    try:
+        best = None
+        for _ in range(rounds):
+            parsing[0] = 0
+            results = query()
+            best = parsing[0] if best is None else min(best, parsing[0])
+
+    finally:
+        for module in PARSING_MODULES:
+            module.parse_html = parse_html
+
+    return comparable(results), best
+
+
+def main():
+    parser = OptionParser(usage='%prog [-n ROUNDS] [--without-lxml]')
+    parser.add_option(
+        '-n', '--rounds', dest='rounds', type='int', default=10,
+        help='Number of times each query is run, the best time is kept.')
+    parser.add_option(
+        '--without-lxml', dest='without_lxml', action='store_true',
+        default=False, help='Parse the pages as if lxml was not installed.')
+    options, _ = parser.parse_args()
+
+    # Nothing is cached between the rounds
+    cache_region.configure('dogpile.cache.null')
+
+    print('Parser: %s' % providers.STRAINED_PARSER)
+    failed = False
+    for name, query in QUERIES:
+        strained_results, strained = run(query, options.rounds, True)
+        whole_results, whole = run(query, options.rounds, False)
+        if strained_results != whole_results:
+            print('%-12s FAILED: the results differ' % name)
+            failed = True
+            continue
+
+        print('%-12s strained %7.1f ms, whole pages %7.1f ms (%.1fx)' % (
+            name, strained * 1000, whole * 1000, whole / strained))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())